@@ -1,10 +1,20 @@
-import streamlit as st
+import os
+import uuid
 import pandas as pd
+import streamlit as st
 from streamlit_option_menu import option_menu
 from profilingdata import profiledata
 from mlmodels import mlmodels
 from autocleandata import autocleandata
 from data_ana import data_analysis_section
+from ingestdata import concat_chunks, read_csv_chunked
+from perftrace import Trace, stage, use_trace
+from outofcore import DEDUP_ROWS, clean_file, file_stats, needs_out_of_core, sample_rows
+from jobs import clean_job, job_queue, profile_job
+from datastore import (
+    append_dataset, dataset_path, delete_dataset, has_dataset, has_parts, list_datasets, load_cleaner, load_dataset,
+    parquet_bytes, record_dataset, save_cleaner, save_dataset, source_fingerprint,
+)
 
 if 'original_df' not in st.session_state:
     st.session_state.original_df = None
@@ -12,7 +22,173 @@ if 'original_df' not in st.session_state:
 if 'cleaned_df' not in st.session_state:
     st.session_state.cleaned_df = None
 
+if 'dataset_key' not in st.session_state:
+    st.session_state.dataset_key = None
+
+if 'cleaner' not in st.session_state:
+    st.session_state.cleaner = None
+
+if 'out_of_core' not in st.session_state:
+    st.session_state.out_of_core = False
+
+if 'trace' not in st.session_state:
+    st.session_state.trace = Trace("optiml")
+
+if 'session_id' not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex
+
+def load_session_dataset(key, kind):
+    path = dataset_path(key, kind)
+    if needs_out_of_core(path):
+        return sample_rows(path)
+    return load_dataset(key, kind)
+
+def open_stored_dataset(key):
+    st.session_state.dataset_key = key
+    st.session_state.out_of_core = needs_out_of_core(dataset_path(key, "original"))
+    st.session_state.original_df = load_session_dataset(key, "original")
+    st.session_state.cleaned_df = load_session_dataset(key, "cleaned") if has_dataset(key, "cleaned") else None
+    st.session_state.cleaner = load_cleaner(key) if st.session_state.cleaned_df is not None else None
+
+def append_rows(new_df):
+    cleaner = st.session_state.cleaner
+    cleaned_rows = cleaner.append(new_df)
+    st.session_state.original_df = concat_chunks([
+        st.session_state.original_df, new_df.reindex(columns=st.session_state.original_df.columns)
+    ])
+    st.session_state.cleaned_df = pd.concat([st.session_state.cleaned_df, cleaned_rows], ignore_index=True)
+    key = st.session_state.dataset_key
+    if key is not None:
+        append_dataset(new_df.reindex(columns=st.session_state.original_df.columns), key, "original")
+        append_dataset(cleaned_rows, key, "cleaned")
+        save_cleaner(cleaner, key, append=True)
+    return len(cleaned_rows)
+
+def source_marker(source):
+    if isinstance(source, str):
+        stat = os.stat(source)
+        return ("path", os.path.abspath(source), stat.st_size, stat.st_mtime_ns)
+    return ("upload", getattr(source, "file_id", None) or source.name, source.size)
+
+# Hashing a large local file takes as long as reading it, so the key is reused across reruns
+# until the path, size or modification time changes.
+def fingerprint_source(source):
+    marker = source_marker(source)
+    memo = st.session_state.get("source_key")
+    if memo is not None and memo[0] == marker:
+        return memo[1]
+    if isinstance(source, str):
+        with open(source, "rb") as f:
+            key = source_fingerprint(f)
+    else:
+        key = source_fingerprint(source)
+    st.session_state.source_key = (marker, key)
+    return key
+
+def clean_large_file(source, key, name):
+    progress = st.progress(0.0, text="Cleaning file out of core...")
+    report = clean_file(
+        source, dataset_path(key, "original"), dataset_path(key, "cleaned"),
+        progress_callback=lambda fraction: progress.progress(fraction, text="Cleaning file out of core..."),
+    )
+    progress.empty()
+    record_dataset(key, "original", report["rows_before"], report["columns_before"], name=name)
+    record_dataset(key, "cleaned", report["rows_after"], report["columns_after"])
+    open_stored_dataset(key)
+
+    st.success(
+        f"File cleaned out of core: {report['rows_before']:,} → {report['rows_after']:,} rows, "
+        f"{report['columns_before']} → {report['columns_after']} columns!"
+    )
+    if not report["deduplicated"]:
+        st.warning(f"Duplicate rows were kept: the file has more than {DEDUP_ROWS:,} distinct rows, "
+                   "raise OPTIML_DEDUP_ROWS to deduplicate it exactly.")
+    stats, overview = file_stats(dataset_path(key, "cleaned"))
+    c1, c2 = st.columns(2)
+    with c1:
+        for item, value in overview.items():
+            st.write(f"- {item}: {value}")
+    with c2:
+        st.dataframe(stats)
+    st.info("The dataset is larger than memory; the other pages work on a random sample of its rows.")
+
+def performance_panel(trace):
+    with st.sidebar.expander("Performance"):
+        stages = trace.frame()
+        if stages.empty:
+            st.write("No stages recorded yet.")
+            return
+        top_level = stages[stages["depth"] == 0]
+        st.write(f"- Stages: {len(stages)}")
+        st.write(f"- Wall time: {top_level['wall_seconds'].sum():.2f} s")
+        st.write(f"- CPU time: {(top_level['cpu_seconds'] + top_level['child_cpu_seconds']).sum():.2f} s")
+        st.write(f"- Peak RSS (whole process): {stages['peak_rss_mb'].max():,.0f} MB")
+        largest = stages.loc[stages["stage_growth_mb"].idxmax()]
+        st.write(f"- Largest growth in a stage: {largest['stage_growth_mb']:,.0f} MB ({largest['stage']})")
+        st.caption("Memory is measured for the whole server process, so it includes other sessions and threads "
+                   "running at the same time.")
+        st.dataframe(stages.assign(stage=["  " * depth + name for depth, name in zip(stages["depth"], stages["stage"])]))
+        st.download_button("Download trace (JSON)", trace.to_json(), "optiml_trace.json", "application/json")
+        if st.button("Clear trace"):
+            trace.clear()
+            st.rerun()
+
+# Only the small summary a job sends back is drawn on every rerun; cleaned frames, profiles
+# and model packages are loaded from the job's result file when asked for.
+def show_job_result(job):
+    summary = job.summary or {}
+    if job.kind == "clean":
+        st.write(f"{summary['rows']:,} rows × {summary['columns']} columns")
+        if st.button("Open cleaned data", key=f"open_{job.id}"):
+            if summary["key"] is not None:
+                open_stored_dataset(summary["key"])
+            else:
+                result = job_queue.result(job.id)
+                st.session_state.cleaned_df = result["cleaned"]
+                st.session_state.cleaner = result["cleaner"]
+            st.rerun()
+    elif job.kind == "profile":
+        for item, value in summary["overview"].items():
+            st.write(f"- {item}: {value}")
+        if st.button("Show column statistics", key=f"profile_{job.id}"):
+            result = job_queue.result(job.id)
+            st.dataframe(result["stats"])
+            if result["correlations"] is not None:
+                st.dataframe(result["correlations"])
+    elif job.kind == "train":
+        st.write(f"Best model: {summary['model']}")
+        st.dataframe(summary["compare_df"])
+        if st.button("Prepare model package", key=f"prepare_{job.id}"):
+            st.download_button("Download Trained Model Package", job_queue.result(job.id)["package"],
+                               "model_package.zip", "application/zip", key=f"package_{job.id}")
+
+def jobs_panel(owner):
+    jobs = job_queue.list(owner)
+    with st.sidebar.expander(f"Background jobs ({sum(job.active for job in jobs)} running)"):
+        if not jobs:
+            st.write("No background jobs yet.")
+            return
+        if st.button("Refresh"):
+            st.rerun()
+        for job in jobs:
+            stage_text = f", {job.stage}" if job.stage and job.active else ""
+            st.write(f"**{job.name}** ({job.kind}): {job.status}{stage_text}, {job.elapsed:,.0f} s")
+            if job.progress is not None and job.active:
+                st.progress(job.progress)
+            if job.error:
+                st.error(job.error)
+            if job.status == "done":
+                show_job_result(job)
+            if job.active:
+                if st.button("Cancel", key=f"cancel_{job.id}"):
+                    job_queue.cancel(job.id)
+                    st.rerun()
+            elif st.button("Remove", key=f"remove_{job.id}"):
+                job_queue.remove(job.id)
+                st.rerun()
+
 def main():
+    use_trace(st.session_state.trace)
     st.set_page_config(page_title="OptiML Suite", layout="wide")
     st.title("OptiML Suite")
     with st.sidebar:
@@ -26,12 +202,64 @@ def main():
 
     # 1. Upload File
     if selected == "Upload File":
+        stored = list_datasets()
+        if stored:
+            with st.expander("Open a stored dataset"):
+                labels = {
+                    f"{entry['name']} ({entry['kinds']['original']['rows']:,} rows"
+                    f"{', cleaned' if 'cleaned' in entry['kinds'] else ''}, {entry['created']})": key
+                    for key, entry in stored.items()
+                }
+                label = st.selectbox("Stored datasets", list(labels))
+                c1, c2 = st.columns(2)
+                with c1:
+                    if st.button("Open dataset"):
+                        open_stored_dataset(labels[label])
+                        st.success("Dataset opened from the store!")
+                with c2:
+                    if st.button("Delete dataset"):
+                        delete_dataset(labels[label])
+                        st.rerun()
+
         datacsv = st.file_uploader("Upload data file", type="csv")
+        local_path = st.text_input("Or enter the path of a local CSV file (for files too large to upload)")
+        source, name = None, None
         if datacsv:
-            df = pd.read_csv(datacsv, low_memory=False)
-            st.session_state.original_df = df
-            st.session_state.cleaned_df = None
-            st.success("File uploaded successfully!")
+            source, name = datacsv, datacsv.name
+        elif local_path:
+            if os.path.isfile(local_path):
+                source, name = local_path, os.path.basename(local_path)
+            else:
+                st.warning("File not found.")
+
+        if source is not None:
+            key = fingerprint_source(source)
+            if has_dataset(key, "original"):
+                if st.session_state.dataset_key != key:
+                    open_stored_dataset(key)
+                df = st.session_state.original_df
+                st.success("File already in the dataset store, opened the stored copy!")
+            elif needs_out_of_core(source):
+                with stage("upload.out_of_core"):
+                    clean_large_file(source, key, name)
+                df = st.session_state.original_df
+            else:
+                progress = st.progress(0.0, text="Reading file...")
+                df, report = read_csv_chunked(
+                    source, progress_callback=lambda fraction: progress.progress(fraction, text="Reading file...")
+                )
+                progress.empty()
+                save_dataset(df, key, "original", name=name)
+                st.session_state.dataset_key = key
+                st.session_state.original_df = df
+                st.session_state.cleaned_df = None
+                st.session_state.cleaner = None
+                st.session_state.out_of_core = False
+                st.success("File uploaded successfully!")
+                st.write(
+                    f"Memory footprint: {report['memory_before'] / 1024**2:.2f} MB → "
+                    f"{report['memory_after'] / 1024**2:.2f} MB after dtype downcasting"
+                )
             st.dataframe(df)
 
     # 2. Data Profiling and Cleaning
@@ -42,18 +270,61 @@ def main():
             st.dataframe(df)
             st.write("Shape before cleaning:", df.shape)
 
-            if st.button("Clean Data"):
-                cleaned = autocleandata(df)
-                st.session_state.cleaned_df = cleaned
-                st.success("Data cleaned and saved!")
+            if st.session_state.out_of_core:
+                st.info(
+                    "This dataset was cleaned out of core when it was loaded; the tables below show a random sample. "
+                    f"The full cleaned data is stored at {dataset_path(st.session_state.dataset_key, 'cleaned')}."
+                )
+            else:
+                background = st.checkbox("Clean in the background", key="clean_background",
+                                         help="Keep using the app while the data is cleaned; the result "
+                                              "appears under Background jobs in the sidebar")
+                if st.button("Clean Data"):
+                    if background:
+                        job_queue.submit("clean", clean_job, df, st.session_state.dataset_key, name="Clean data",
+                                         owner=st.session_state.session_id)
+                        st.info("Cleaning started in the background.")
+                    else:
+                        cleaned, cleaner = autocleandata(df)
+                        st.session_state.cleaned_df = cleaned
+                        st.session_state.cleaner = cleaner
+                        if st.session_state.dataset_key is not None:
+                            save_dataset(cleaned, st.session_state.dataset_key, "cleaned")
+                            save_cleaner(cleaner, st.session_state.dataset_key)
+                        st.success("Data cleaned and saved!")
+
+            if st.session_state.cleaner is not None:
+                with st.expander("Append new rows"):
+                    appendcsv = st.file_uploader("Upload rows to append", type="csv", key="append_csv")
+                    if appendcsv and st.button("Append and clean"):
+                        new_df, report = read_csv_chunked(appendcsv)
+                        kept = append_rows(new_df)
+                        st.success(f"Appended {kept:,} of {report['rows']:,} rows after removing duplicates!")
 
-            if st.session_state.cleaned_df is not None:
+            if st.session_state.cleaned_df is not None and not st.session_state.out_of_core:
                 st.subheader("Cleaned Data")
                 cleaned_df = st.session_state.cleaned_df
                 st.dataframe(cleaned_df)
                 st.write("Shape after cleaning:", cleaned_df.shape)
                 csv = cleaned_df.to_csv(index=False).encode('utf-8')
                 st.download_button("Download Cleaned CSV", csv, "cleaned_data.csv", "text/csv")
+                key = st.session_state.dataset_key
+                if key is not None and has_dataset(key, "cleaned") and not has_parts(key, "cleaned"):
+                    with open(dataset_path(key, "cleaned"), "rb") as f:
+                        parquet = f.read()
+                else:
+                    parquet = parquet_bytes(cleaned_df)
+                st.download_button("Download Cleaned Parquet", parquet, "cleaned_data.parquet", "application/octet-stream")
+
+            if st.button("Profile in the background"):
+                profile_target = (
+                    st.session_state.cleaned_df
+                    if st.session_state.cleaned_df is not None
+                    else st.session_state.original_df
+                )
+                job_queue.submit("profile", profile_job, profile_target, name="Profile data",
+                                 owner=st.session_state.session_id)
+                st.info("Profiling started in the background.")
 
             if st.checkbox("Show Profile Report"):
                 profile_target = (
@@ -94,5 +365,8 @@ def main():
         else:
             st.warning("Please upload and clean the data first.")
 
+    jobs_panel(st.session_state.session_id)
+    performance_panel(st.session_state.trace)
+
 if __name__ == '__main__':
     main()
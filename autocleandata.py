@@ -1,34 +1,164 @@
+import copy
 import pandas as pd
 import numpy as np
-import re
 from sklearn.impute import SimpleImputer
+import pyarrow as pa
+import pyarrow.compute as pc
 from dateutil.parser import parse
+from pandas.api.types import is_numeric_dtype
+from datacache import cached
+from parallelclean import map_columns
+from perftrace import traced
 
+DATE_FORMATS = [
+    "%Y-%m-%d", "%Y/%m/%d", "%m/%d/%Y", "%d/%m/%Y", "%m-%d-%Y", "%d-%m-%Y", "%d.%m.%Y",
+    "%m/%d/%y", "%d/%m/%y", "%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%d %H:%M",
+    "%m/%d/%Y %H:%M:%S", "%m/%d/%Y %H:%M", "%d/%m/%Y %H:%M:%S", "%d/%m/%Y %H:%M",
+    "%d %b %Y", "%d %B %Y", "%b %d %Y", "%b %d, %Y", "%B %d, %Y",
+]
+TIME_FORMATS = ["%H:%M:%S", "%H:%M", "%H:%M:%S.%f", "%I:%M:%S %p", "%I:%M %p"]
+MONEY_PATTERN = r'^\s*[\$€₹]?\s*-?\d+(\.\d+)?\s*$'
+# Same characters as re.sub(r'[^a-zA-Z0-9\s]', '', value.lower()) keeps; RE2's \s is ASCII-only,
+# so Python's Unicode whitespace is spelled out.
+TEXT_STRIP_PATTERN = (
+    r"[^a-zA-Z0-9\t\n\x0b\x0c\r\x1c-\x1f \x{85}\x{a0}\x{1680}\x{2000}-\x{200a}"
+    r"\x{2028}\x{2029}\x{202f}\x{205f}\x{3000}]"
+)
+TEXT_KEEP_BYTES = np.zeros(256, dtype=bool)
+TEXT_KEEP_BYTES[list(b"abcdefghijklmnopqrstuvwxyz0123456789\t\n\x0b\x0c\r\x1c\x1d\x1e\x1f ")] = True
+UNIQUE_SAMPLE_ROWS = 10_000
+
+def row_fingerprints(df):
+    normalized = {
+        col: df[col].astype(np.float64) + 0.0 if is_numeric_dtype(df[col].dtype) and df[col].dtype != bool else df[col]
+        for col in df.columns
+    }
+    return pd.util.hash_pandas_object(pd.DataFrame(normalized, index=df.index), index=False).to_numpy()
+
+# Fingerprints only narrow the search: rows sharing a hash are compared by value, since
+# hashing stringifies mixed object columns (1 and '1' collide). The hashes then seed RowHashes.
+def drop_duplicate_rows(df):
+    hashes = row_fingerprints(df)
+    candidates = pd.Series(hashes).duplicated(keep=False).to_numpy()
+    if not candidates.any():
+        return df, hashes
+    duplicated = np.zeros(len(df), dtype=bool)
+    duplicated[candidates] = df[candidates].duplicated().to_numpy()
+    return df[~duplicated], hashes[~duplicated]
+
+# Counts distinct non-null values up to two, scanning growing blocks so that the common case,
+# a column that varies early on, stops after the first few thousand rows.
+def capped_nunique(series, block=1024):
+    first = None
+    start = 0
+    while start < len(series):
+        values = series.iloc[start:start + block]
+        values = values[values.notna()]
+        if len(values):
+            if first is None:
+                first = values.iloc[0]
+            if (values != first).any():
+                return 2
+        start += block
+        block *= 4
+    return 0 if first is None else 1
+
+def varying_columns(df):
+    return [col for col in df.columns if capped_nunique(df[col]) > 1]
+
+@traced("clean.wrangle")
 def basic_wraggling(df, dupli=True):
     if dupli:
-        df.drop_duplicates(inplace=True)
-    df.dropna(axis=1, how='all', inplace=True)
-    df.dropna(axis=0, how='all', inplace=True)
-    df = df.drop(columns=[col for col in df.columns if df[col].nunique() == 1])
-    return df
+        df, _ = drop_duplicate_rows(df)
+    columns = varying_columns(df)
+    if len(columns) < df.shape[1]:
+        df = df[columns]
+    return df.dropna(axis=0, how='all')
+
+def sample_column(series, sample_size=1000):
+    if len(series) > sample_size:
+        series = series.sample(n=sample_size, random_state=0)
+    return series.astype(object)
+
+def best_format(values, formats):
+    best_fmt, best_count = None, 0
+    for fmt in formats:
+        count = pd.to_datetime(values, format=fmt, errors='coerce').notna().sum()
+        if count > best_count:
+            best_fmt, best_count = fmt, count
+    return best_fmt, best_count
 
-def clean_money_columns(df):
-    def is_money(value):
+def parse_with_dateutil(values):
+    def parse_value(value):
         try:
-            return bool(re.match(r'^\s*[\$€₹]?\s*-?\d+(\.\d+)?\s*$', str(value)))
-        except:
-            return False
+            return parse(value, fuzzy=False).replace(tzinfo=None)
+        except Exception:
+            return None
+
+    parsed = {value: parse_value(value) for value in pd.unique(values)}
+    return pd.to_datetime(values.map(parsed), errors='coerce')
+
+def parse_datetimes(series, fmt):
+    values = series.astype(str)
+    if fmt is None:
+        return parse_with_dateutil(values)
+    parsed = pd.to_datetime(values, format=fmt, errors='coerce')
+    # cells written in another format than the column's dominant one fall back to dateutil
+    missed = parsed.isna() & series.notna()
+    if missed.any():
+        parsed[missed] = parse_with_dateutil(values[missed])
+    return parsed
+
+def classify_column(series, sample_size=1000):
+    if is_numeric_dtype(series.dtype):
+        return None
+    sample = sample_column(series, sample_size)
+    if len(sample) == 0:
+        return None
+
+    strings = sample[sample.map(lambda x: isinstance(x, str))]
+    if len(strings):
+        fmt, count = best_format(strings, DATE_FORMATS)
+        if count / len(sample) > 0.8:
+            return ("date", fmt)
+        fmt, count = best_format(strings, TIME_FORMATS)
+        if count / len(sample) > 0.5:
+            return ("time", fmt)
+
+    if sample.astype(str).str.match(MONEY_PATTERN).mean() > 0.5:
+        return ("money", None)
+
+    if len(strings):
+        rate = parse_with_dateutil(strings).notna().sum() / len(sample)
+        if rate > 0.8:
+            return ("date", None)
+        if rate > 0.5:
+            return ("time", None)
+    return None
 
-    money_cols = []
+@traced("clean.classify")
+def classify_columns(df, sample_size=1000):
+    column_kinds = {}
     for col in df.columns:
-        if df[col].apply(lambda x: is_money(str(x))).mean() > 0.5:
-            money_cols.append(col)
-    
+        kind = classify_column(df[col], sample_size)
+        if kind is not None:
+            column_kinds[col] = kind
+    return column_kinds
+
+def money_values(series):
+    values = series.astype(str).str.replace(r'[^\d.-]', '', regex=True)
+    return pd.to_numeric(values, errors='coerce').to_frame(series.name)
+
+def clean_money_columns(df, column_kinds=None):
+    if column_kinds is None:
+        column_kinds = classify_columns(df)
+
+    money_cols = [col for col, (kind, _) in column_kinds.items() if kind == "money" and col in df.columns]
     for col in money_cols:
-        df[col] = df[col].astype(str).str.replace(r'[^\d.-]', '', regex=True)
-        df[col] = pd.to_numeric(df[col], errors='coerce')
+        df[col] = money_values(df[col])[col]
     return df
 
+@traced("clean.impute")
 def impute_missing_values(df):
     numeric_cols = df.select_dtypes(include=[np.number]).columns
     categorical_cols = df.select_dtypes(include=[object]).columns
@@ -36,92 +166,265 @@ def impute_missing_values(df):
     num_imputer = SimpleImputer(strategy='mean')
     cat_imputer = SimpleImputer(strategy='most_frequent')
 
-    df[numeric_cols] = num_imputer.fit_transform(df[numeric_cols])
-    df[categorical_cols] = cat_imputer.fit_transform(df[categorical_cols])
+    if len(numeric_cols):
+        df[numeric_cols] = num_imputer.fit_transform(df[numeric_cols])
+    if len(categorical_cols):
+        df[categorical_cols] = cat_imputer.fit_transform(df[categorical_cols])
     return df
 
-def clean_date_column(df):
-    def is_date(value):
-        try:
-            parse(value, fuzzy=False)
-            return True
-        except Exception:
-            return False
-        
-    def parse_date(value):
-        try:
-            date = parse(value, dayfirst=False, yearfirst=False, fuzzy=False)
-            return date.day, date.month, date.year
-        except Exception:
-            return None, None, None
-    
-    potential_date_cols = []
-    for col in df.columns:
-        if not np.issubdtype(df[col].dtype, np.number):
-            if df[col].apply(lambda x: isinstance(x, str) and is_date(str(x))).mean() > 0.8:
-                potential_date_cols.append(col)
+def date_parts(series, fmt):
+    parsed_dates = parse_datetimes(series, fmt)
+    return pd.DataFrame({
+        f"{series.name}_dd": parsed_dates.dt.day,
+        f"{series.name}_mm": parsed_dates.dt.month,
+        f"{series.name}_yyyy": parsed_dates.dt.year,
+    })
+
+def time_parts(series, fmt):
+    parsed_times = parse_datetimes(series, fmt)
+    return pd.DataFrame({
+        f"{series.name}_hh": parsed_times.dt.hour,
+        f"{series.name}_mm": parsed_times.dt.minute,
+        f"{series.name}_ss": parsed_times.dt.second,
+    })
+
+# ASCII-only arrays are stripped with a byte lookup over the Arrow data buffer instead of a
+# regex per value.
+def strip_ascii(array):
+    offsets = np.frombuffer(array.buffers()[1], dtype=np.int64)[array.offset:array.offset + len(array) + 1]
+    data = np.frombuffer(array.buffers()[2], dtype=np.uint8)[offsets[0]:offsets[-1]]
+    keep = TEXT_KEEP_BYTES[data]
+    kept = np.concatenate([[0], np.cumsum(keep)])
+    return pa.LargeStringArray.from_buffers(
+        len(array), pa.py_buffer(kept[offsets - offsets[0]]), pa.py_buffer(data[keep]),
+    )
+
+def normalize_strings(values):
+    array = pa.array(values, type=pa.large_string())
+    if pc.all(pc.string_is_ascii(array)).as_py() is not False:
+        return strip_ascii(pc.ascii_lower(array)).to_numpy(zero_copy_only=False)
+    lowered = pc.utf8_lower(array)
+    return pc.replace_substring_regex(lowered, TEXT_STRIP_PATTERN, "").to_numpy(zero_copy_only=False)
+
+def text_mask(values):
+    if pd.api.types.infer_dtype(values, skipna=True) == "string":
+        return ~pd.isna(values)
+    return np.fromiter((isinstance(value, str) for value in values), dtype=bool, count=len(values))
+
+def mostly_unique(series, sample_rows=UNIQUE_SAMPLE_ROWS):
+    sample = series.iloc[::max(1, len(series) // sample_rows)]
+    return sample.nunique() > 0.9 * len(sample)
+
+# Text columns repeat heavily, so only the distinct values are normalized and then mapped back
+# through the factorized codes; columns that are mostly unique skip the factorization.
+def normalize_text(series, as_category=False):
+    if series.dtype != object:
+        series = series.astype(object).where(series.notna(), np.nan)
+    if not as_category and mostly_unique(series):
+        values = series.to_numpy(dtype=object, copy=True)
+        is_text = text_mask(values)
+        if not is_text.any():
+            return series.infer_objects().to_frame(series.name)
+        values[is_text] = normalize_strings(values[is_text])
+        return pd.Series(values, index=series.index, name=series.name).to_frame()
+
+    codes, uniques = pd.factorize(series)
+    uniques = np.asarray(uniques, dtype=object)
+    is_text = text_mask(uniques)
+    if is_text.any():
+        uniques[is_text] = normalize_strings(uniques[is_text])
 
+    if as_category:
+        codes_after, categories = pd.factorize(uniques)
+        codes = np.append(codes_after, -1)[codes]
+        values = pd.Categorical.from_codes(codes, categories)
+    elif not is_text.any():
+        return series.infer_objects().to_frame(series.name)
+    else:
+        values = series.to_numpy(dtype=object, copy=True)
+        text_cells = np.flatnonzero(is_text[codes] & (codes >= 0))
+        values[text_cells] = uniques[codes[text_cells]]
+    return pd.Series(values, index=series.index, name=series.name).to_frame()
+
+def clean_date_column(df, column_kinds=None):
+    if column_kinds is None:
+        column_kinds = classify_columns(df)
+
+    potential_date_cols = [col for col, (kind, _) in column_kinds.items() if kind == "date" and col in df.columns]
     for col in potential_date_cols:
-        parsed_dates = df[col].astype(str).apply(parse_date)
-        
-        df[f"{col}_dd"] = parsed_dates.apply(lambda x: x[0])
-        df[f"{col}_mm"] = parsed_dates.apply(lambda x: x[1])
-        df[f"{col}_yyyy"] = parsed_dates.apply(lambda x: x[2])
-        
-        df[f"{col}_dd"] = df[f"{col}_dd"].replace({None: np.nan})
-        df[f"{col}_mm"] = df[f"{col}_mm"].replace({None: np.nan})
-        df[f"{col}_yyyy"] = df[f"{col}_yyyy"].replace({None: np.nan})
+        for name, values in date_parts(df[col], column_kinds[col][1]).items():
+            df[name] = values
         df.drop(columns=[col], inplace=True)
     return df
 
-def clean_time_column(df):
-    def is_time(value):
-        try:
-            time = parse(value, fuzzy=False)
-            return time.time() is not None
-        except Exception:
-            return False
-
-    def parse_time(value):
-        try:
-            time = parse(value, fuzzy=False)
-            return time.hour, time.minute, time.second
-        except Exception:
-            return None, None, None
-
-    potential_time_cols = []
-    for col in df.columns:
-        if df[col].apply(lambda x: isinstance(x, str) and is_time(str(x))).mean() > 0.5:
-            potential_time_cols.append(col)
+def clean_time_column(df, column_kinds=None):
+    if column_kinds is None:
+        column_kinds = classify_columns(df)
 
+    potential_time_cols = [col for col, (kind, _) in column_kinds.items() if kind == "time" and col in df.columns]
     for col in potential_time_cols:
-        parsed_times = df[col].astype(str).apply(parse_time)
-        
-        df[f"{col}_hh"] = parsed_times.apply(lambda x: x[0])
-        df[f"{col}_mm"] = parsed_times.apply(lambda x: x[1])
-        df[f"{col}_ss"] = parsed_times.apply(lambda x: x[2])
-
-        df[f"{col}_hh"] = df[f"{col}_hh"].replace({None: np.nan})
-        df[f"{col}_mm"] = df[f"{col}_mm"].replace({None: np.nan})
-        df[f"{col}_ss"] = df[f"{col}_ss"].replace({None: np.nan})
+        for name, values in time_parts(df[col], column_kinds[col][1]).items():
+            df[name] = values
         df.drop(columns=[col], inplace=True)
     return df
 
-def clean_text_column(df):
-    object_cols = df.select_dtypes(include=[object]).columns
+def clean_text_column(df, as_category=False):
+    object_cols = df.select_dtypes(include=[object, "category", "string"]).columns
     for col in object_cols:
-        df[col] = df[col].apply(
-            lambda x: re.sub(r'[^a-zA-Z0-9\s]', '', x.lower()) if isinstance(x, str) else x
-        )
+        df[col] = normalize_text(df[col], as_category)[col]
     return df
 
-def autocleandata(df):
-    df = basic_wraggling(df)
-    df = clean_date_column(df)
-    df = clean_time_column(df)
-    df = clean_money_columns(df)
-    df = clean_text_column(df)
-    df = basic_wraggling(df, dupli=False)
-    df = impute_missing_values(df)
-    df = df.loc[:, df.nunique() > 1]
-    return df
\ No newline at end of file
+def clean_column(series, kind, fmt=None):
+    if kind == "date":
+        return date_parts(series, fmt)
+    if kind == "time":
+        return time_parts(series, fmt)
+    if kind == "money":
+        return money_values(series)
+    return normalize_text(series)
+
+@traced("clean.columns")
+def clean_columns(df, column_kinds, workers=None):
+    column_kinds = {col: kind for col, kind in column_kinds.items() if col in df.columns}
+    text_cols = [
+        col for col in df.select_dtypes(include=[object, "category", "string"]).columns if col not in column_kinds
+    ]
+    tasks = [(col, column_kinds[col]) for col in column_kinds] + [(col, ("text", None)) for col in text_cols]
+    results = dict(zip([col for col, _ in tasks], map_columns(df, clean_column, tasks, workers)))
+
+    columns = {}
+    for col in df.columns:
+        kind = column_kinds.get(col, (None, None))[0]
+        if kind in ("date", "time"):
+            continue
+        columns[col] = results[col][col] if col in results else df[col]
+    for kind in ("date", "time"):
+        for col in column_kinds:
+            if column_kinds[col][0] == kind:
+                columns.update(results[col].items())
+    return pd.DataFrame(columns, index=df.index)
+
+def most_frequent(counts):
+    counts = counts[counts == counts.max()]
+    try:
+        return counts.sort_index().index[0]
+    except TypeError:
+        return counts.index[0]
+
+# Hashes live in sorted segments that merge like a binary counter, so adding a batch
+# only touches segments no larger than itself instead of re-sorting every row seen.
+class RowHashes:
+    def __init__(self):
+        self.segments = []
+
+    def __len__(self):
+        return sum(len(segment) for segment in self.segments)
+
+    def contains(self, hashes):
+        mask = np.zeros(len(hashes), dtype=bool)
+        for segment in self.segments:
+            positions = np.minimum(np.searchsorted(segment, hashes), len(segment) - 1)
+            mask |= segment[positions] == hashes
+        return mask
+
+    def add(self, hashes):
+        segment = np.unique(hashes)
+        while self.segments and len(self.segments[-1]) <= len(segment):
+            segment = np.union1d(self.segments.pop(), segment)
+        if len(segment):
+            self.segments.append(segment)
+
+    def add_new(self, hashes):
+        new_rows = ~pd.Series(hashes).duplicated().to_numpy() & ~self.contains(hashes)
+        self.add(hashes[new_rows])
+        return new_rows
+
+class IncrementalCleaner:
+    def __init__(self, workers=None):
+        self.workers = workers
+        self.raw_columns = []
+        self.column_kinds = {}
+        self.columns = []
+        self.dtypes = pd.Series(dtype=object)
+        self.sums = pd.Series(dtype=float)
+        self.counts = pd.Series(dtype=float)
+        self.frequencies = {}
+        self.row_hashes = RowHashes()
+        self.unsaved_hashes = []
+        self.rows = 0
+
+    @traced("clean.fit")
+    def fit_transform(self, df):
+        columns = list(df.columns)
+        df, hashes = drop_duplicate_rows(df)
+        df = basic_wraggling(df, dupli=False)
+        self.raw_columns = list(df.columns)
+        self.row_hashes = RowHashes()
+        self.row_hashes.add(hashes if self.raw_columns == columns else row_fingerprints(df))
+        self.unsaved_hashes = []
+        self.column_kinds = classify_columns(df)
+        df = self.transform_columns(df)
+        df = basic_wraggling(df, dupli=False)
+
+        numeric_cols = df.select_dtypes(include=[np.number]).columns
+        categorical_cols = df.select_dtypes(include=[object]).columns
+        self.sums = df[numeric_cols].sum()
+        self.counts = df[numeric_cols].count().astype(float)
+        self.frequencies = {col: df[col].value_counts() for col in categorical_cols}
+
+        df = impute_missing_values(df)
+        df = df[varying_columns(df)]
+        self.columns = list(df.columns)
+        self.dtypes = df.dtypes
+        self.sums = self.sums[self.sums.index.isin(self.columns)]
+        self.counts = self.counts[self.counts.index.isin(self.columns)]
+        self.frequencies = {col: counts for col, counts in self.frequencies.items() if col in self.columns}
+        self.rows = len(df)
+        return df
+
+    def transform_columns(self, df):
+        return clean_columns(df, self.column_kinds, self.workers)
+
+    def update_statistics(self, df):
+        numeric_cols = list(self.sums.index)
+        self.sums = self.sums.add(df[numeric_cols].sum(), fill_value=0)
+        self.counts = self.counts.add(df[numeric_cols].count(), fill_value=0)
+        for col, counts in self.frequencies.items():
+            self.frequencies[col] = counts.add(df[col].value_counts(), fill_value=0)
+
+    def impute(self, df):
+        fill = (self.sums / self.counts.replace(0, np.nan)).dropna().to_dict()
+        fill.update({col: most_frequent(counts) for col, counts in self.frequencies.items() if len(counts)})
+        return df.fillna(fill)
+
+    @traced("clean.append")
+    def append(self, df):
+        df = df.reindex(columns=self.raw_columns).dropna(how='all')
+        hashes = row_fingerprints(df)
+        new_rows = self.row_hashes.add_new(hashes)
+        self.unsaved_hashes.append(hashes[new_rows])
+        df = df[new_rows].copy()
+        if len(df) == 0:
+            return pd.DataFrame({col: pd.Series(dtype=dtype) for col, dtype in self.dtypes.items()})
+
+        df = self.transform_columns(df)
+        df = df.dropna(how='all').reindex(columns=self.columns)
+        self.update_statistics(df)
+        df = self.impute(df)
+        for col, dtype in self.dtypes.items():
+            try:
+                df[col] = df[col].astype(dtype)
+            except (TypeError, ValueError):
+                pass
+        self.rows += len(df)
+        return df
+
+@cached
+def fitted_cleaner(df, workers=None):
+    cleaner = IncrementalCleaner(workers=workers)
+    return cleaner.fit_transform(df), cleaner
+
+def autocleandata(df, workers=None):
+    cleaned, cleaner = fitted_cleaner(df, workers)
+    # the cached cleaner is shared between reruns, and appending rows mutates it
+    return cleaned, copy.deepcopy(cleaner)
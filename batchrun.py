@@ -0,0 +1,184 @@
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from autocleandata import autocleandata
+from col_datatype import variable_types
+from col_stats import column_stats, dataset_stats
+from correlations import correlation_matrix, top_pairs
+from ingestdata import read_csv_chunked
+from modelscheduler import default_workers
+from outofcore import clean_file, file_stats, needs_out_of_core, sample_rows
+from perftrace import Trace, stage, use_trace
+
+def dataset_files(paths):
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(
+                os.path.join(path, name) for name in os.listdir(path) if name.lower().endswith(".csv")
+            ))
+        else:
+            files.append(path)
+    return files
+
+def dataset_name(path):
+    return os.path.splitext(os.path.basename(path))[0]
+
+def profile_report(stats, overview, correlations=None):
+    return {
+        "overview": overview,
+        "columns": json.loads(stats.to_json(orient="index", default_handler=str)),
+        "correlations": [] if correlations is None else json.loads(correlations.to_json(orient="records")),
+    }
+
+def ingest_and_clean(path, output_dir, workers=None, exact_dedup=False):
+    cleaned_path = os.path.join(output_dir, "cleaned.parquet")
+    if needs_out_of_core(path):
+        with stage("batch.clean_out_of_core"):
+            report = clean_file(path, os.path.join(output_dir, "original.parquet"), cleaned_path,
+                                dedup=True if exact_dedup else None, workers=workers)
+        stats, overview = file_stats(cleaned_path)
+        shape = (report["rows_after"], report["columns_after"])
+        profile = profile_report(stats, overview)
+        profile["deduplicated"] = report["deduplicated"]
+        return sample_rows(cleaned_path), shape, profile
+
+    df, _ = read_csv_chunked(path)
+    cleaned, _ = autocleandata(df, workers)
+    del df
+    with stage("batch.write_cleaned", cleaned):
+        cleaned.to_parquet(cleaned_path, index=False)
+
+    stats = column_stats(cleaned)
+    corr, counts = correlation_matrix(cleaned)
+    correlations = None if corr is None else top_pairs(corr, counts)
+    return cleaned, cleaned.shape, profile_report(stats, dataset_stats(cleaned, stats), correlations)
+
+def train_dataset(df, target, output_dir, workers=None, model_timeout=None, fast_selection=None, lean=False,
+                  package_format="pickle", use_cache=True, approximate=False):
+    from modeltraining import (
+        create_model_inputs, package_model, prepare_training_data, preprocessing_config, train_model,
+    )
+    from traincache import training_cache
+
+    column_types = variable_types(df)
+    target_type = column_types[target]
+    if target_type == "Text":
+        raise ValueError(f"Target column '{target}' is free text and cannot be trained on")
+    model_inputs = create_model_inputs(df, target, column_types)
+    df, pipeline = prepare_training_data(df, target, target_type, lean=lean, approximate=approximate)
+    if fast_selection is None:
+        fast_selection = len(df) > 100_000
+    best_model, compare_df, _ = train_model(
+        df, target_type, target, workers=workers, model_timeout=model_timeout, fast_selection=fast_selection,
+        cache=training_cache if use_cache else None, preprocessing=preprocessing_config(pipeline),
+    )
+    if best_model is None:
+        raise RuntimeError("No candidate model finished training successfully within its time budget")
+    compare_df.to_csv(os.path.join(output_dir, "model_comparison.csv"))
+    return package_model(os.path.join(output_dir, "model_package.zip"), model_inputs, pipeline, best_model,
+                         package_format)
+
+def run_dataset(path, output_root, target=None, workers=None, model_timeout=None, fast_selection=None, lean=False,
+                package_format="pickle", use_cache=True, train_on_sample=False, exact_dedup=False,
+                approximate=False):
+    output_dir = os.path.join(output_root, dataset_name(path))
+    os.makedirs(output_dir, exist_ok=True)
+    trace = use_trace(Trace(dataset_name(path)))
+    start = time.time()
+    result = {"dataset": path, "output": output_dir}
+    try:
+        df, (result["rows"], result["columns"]), report = ingest_and_clean(path, output_dir, workers, exact_dedup)
+        result["deduplicated"] = report.get("deduplicated", True)
+        with open(os.path.join(output_dir, "profile.json"), "w") as f:
+            json.dump(report, f, indent=4, default=str, ensure_ascii=False)
+        sampled = len(df) < result["rows"]
+
+        if target is None:
+            result["model"] = "skipped (no --target given)"
+        elif target not in df.columns:
+            result["model"] = f"skipped (no '{target}' column after cleaning)"
+        elif sampled and not train_on_sample:
+            result["model"] = (f"skipped (cleaned out of core; pass --train-on-sample to train on "
+                               f"a {len(df):,}-row sample)")
+        else:
+            result["model"] = train_dataset(
+                df, target, output_dir, workers, model_timeout, fast_selection, lean, package_format, use_cache,
+                approximate,
+            )
+            result["training_rows"] = len(df)
+            result["sampled"] = sampled
+    except Exception as e:
+        result["error"] = repr(e)
+    finally:
+        trace.save(os.path.join(output_dir, "trace.json"))
+        use_trace(None)
+    result["seconds"] = round(time.time() - start, 2)
+    return result
+
+def run_batch(paths, output_root, target=None, jobs=1, workers=None, model_timeout=None, fast_selection=None,
+              lean=False, package_format="pickle", use_cache=True, train_on_sample=False, exact_dedup=False,
+              approximate=False):
+    files = dataset_files(paths)
+    jobs = max(1, min(jobs, len(files)))
+    workers = workers or max(1, default_workers() // jobs)
+    arguments = [(path, output_root, target, workers, model_timeout, fast_selection, lean, package_format, use_cache,
+                  train_on_sample, exact_dedup, approximate) for path in files]
+    if jobs == 1:
+        for args in arguments:
+            yield run_dataset(*args)
+        return
+
+    # Every dataset runs in its own process: pycaret keeps its experiment in module globals,
+    # so concurrent trainings must not share an interpreter.
+    context = multiprocessing.get_context("fork") if "fork" in multiprocessing.get_all_start_methods() else None
+    with ProcessPoolExecutor(max_workers=jobs, mp_context=context) as pool:
+        futures = [pool.submit(run_dataset, *args) for args in arguments]
+        for future in futures:
+            yield future.result()
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the OptiML ingest, clean, profile and train pipeline without the UI.")
+    parser.add_argument("inputs", nargs="+", help="CSV files or directories of CSV files")
+    parser.add_argument("--output", default="optiml_output", help="Directory to write one result folder per dataset into")
+    parser.add_argument("--target", help="Target column to train on; training is skipped when omitted")
+    parser.add_argument("--jobs", type=int, default=1, help="Datasets to process concurrently")
+    parser.add_argument("--workers", type=int, default=None, help="Cleaning and training workers per dataset")
+    parser.add_argument("--model-timeout", type=float, default=None, help="Time budget per model in seconds")
+    selection = parser.add_mutually_exclusive_group()
+    selection.add_argument("--fast-selection", dest="fast_selection", action="store_true", default=None)
+    selection.add_argument("--full-selection", dest="fast_selection", action="store_false")
+    parser.add_argument("--lean", action="store_true", help="Train on compact category codes and float32 features")
+    parser.add_argument("--approximate", action="store_true",
+                        help="Estimate outlier quartiles with quantile sketches instead of exact sorts")
+    parser.add_argument("--package-format", default="pickle",
+                        choices=["pickle", "joblib", "joblib-zlib", "joblib-lz4"])
+    parser.add_argument("--no-cache", dest="use_cache", action="store_false", help="Refit every candidate model")
+    parser.add_argument("--train-on-sample", action="store_true",
+                        help="Train on a random sample when a dataset is too large to clean in memory")
+    parser.add_argument("--exact-dedup", action="store_true",
+                        help="Drop duplicate rows of out-of-core datasets even past OPTIML_DEDUP_ROWS distinct rows "
+                             "(8 bytes of memory per row)")
+    args = parser.parse_args()
+
+    failed = 0
+    for result in run_batch(args.inputs, args.output, args.target, args.jobs, args.workers,
+                            args.model_timeout, args.fast_selection, args.lean, args.package_format,
+                            args.use_cache, args.train_on_sample, args.exact_dedup, args.approximate):
+        if "error" in result:
+            failed += 1
+            print(f"✗ {result['dataset']}: {result['error']} ({result['seconds']}s)", flush=True)
+        else:
+            sample = f" trained on a {result['training_rows']:,}-row sample," if result.get("sampled") else ""
+            duplicates = "" if result["deduplicated"] else " duplicates kept (pass --exact-dedup),"
+            print(f"✓ {result['dataset']}: {result['rows']:,} × {result['columns']} cleaned,{duplicates}{sample} "
+                  f"model {result['model']} ({result['seconds']}s) → {result['output']}", flush=True)
+    if failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
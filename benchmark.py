@@ -0,0 +1,195 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import threading
+import time
+import numpy as np
+import pandas as pd
+from autocleandata import IncrementalCleaner
+from col_stats import column_stats, dataset_stats
+from correlations import correlation_matrix
+from datacache import result_cache
+from ingestdata import read_csv_chunked
+from perftrace import current_rss
+from preprocessingdata import preprocessingdata
+from syntheticdata import synthetic_dataset
+
+TIERS = {
+    "small": (10_000, 20),
+    "medium": (100_000, 40),
+    "large": (1_000_000, 60),
+}
+STAGES = ["ingest", "clean", "profile", "preprocess", "train"]
+DATA_DIR = ".benchmark_data"
+REGRESSION_THRESHOLD = 0.2
+MEMORY_SLACK_MB = 16
+
+class MemorySampler:
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.baseline = current_rss()
+        self.peak = self.baseline
+        self.running = True
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def run(self):
+        while self.running:
+            self.peak = max(self.peak, current_rss())
+            time.sleep(self.interval)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.running = False
+        self.thread.join()
+        self.peak = max(self.peak, current_rss())
+
+    @property
+    def peak_delta(self):
+        return self.peak - self.baseline
+
+def dataset_file(tier, seed=0, data_dir=DATA_DIR):
+    rows, columns = TIERS[tier]
+    path = os.path.join(data_dir, f"{tier}_{rows}x{columns}_seed{seed}.csv")
+    if not os.path.exists(path):
+        os.makedirs(data_dir, exist_ok=True)
+        synthetic_dataset(rows, columns, seed=seed).to_csv(f"{path}.tmp", index=False)
+        os.replace(f"{path}.tmp", path)
+    return path
+
+def train_headless(df, target="target", workers=None):
+    from modelscheduler import compare_models_parallel, jobs_per_worker, pycaret_module
+    task = "classification"
+    pycaret_module(task).setup(df, target=target, session_id=1, fold=2, html=False, verbose=False,
+                               n_jobs=jobs_per_worker(workers or 1))
+    best_model, compare_df = compare_models_parallel(task, workers=workers, include=["lr", "dt", "ridge"])
+    return compare_df
+
+def stage_functions(path, workers):
+    inputs = {}
+
+    def ingest():
+        inputs["raw"], _ = read_csv_chunked(path)
+        return inputs["raw"]
+
+    def clean():
+        inputs["cleaned"] = IncrementalCleaner(workers=workers).fit_transform(inputs["raw"].copy())
+        return inputs["cleaned"]
+
+    def profile():
+        column_stats(inputs["cleaned"])
+        dataset_stats(inputs["cleaned"])
+        correlation_matrix(inputs["cleaned"])
+        return inputs["cleaned"]
+
+    def preprocess():
+        inputs["preprocessed"], _ = preprocessingdata(inputs["cleaned"].copy())
+        return inputs["preprocessed"]
+
+    def train():
+        return train_headless(inputs["preprocessed"], workers=workers)
+
+    return {"ingest": ingest, "clean": clean, "profile": profile, "preprocess": preprocess, "train": train}
+
+def run_tier(tier, stages=STAGES, repeat=3, workers=None, seed=0, data_dir=DATA_DIR):
+    rows = TIERS[tier][0]
+    functions = stage_functions(dataset_file(tier, seed, data_dir), workers)
+    results = {}
+    for name in STAGES:
+        if name not in stages:
+            continue
+        if name == "train":
+            try:
+                import pycaret  # noqa: F401
+            except ImportError:
+                results[name] = {"skipped": "pycaret is not installed"}
+                continue
+
+        timings, peaks = [], []
+        for _ in range(1 if name == "train" else repeat):
+            result_cache.clear()
+            with MemorySampler() as memory:
+                start = time.perf_counter()
+                functions[name]()
+                timings.append(time.perf_counter() - start)
+            peaks.append(memory.peak_delta)
+        seconds = min(timings)
+        results[name] = {
+            "seconds": round(seconds, 4),
+            "rows_per_second": round(rows / seconds, 1) if seconds else None,
+            "peak_mb": round(max(peaks) / 1024**2, 2),
+        }
+    return results
+
+def environment():
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+def compare_to_baseline(results, baseline, threshold=REGRESSION_THRESHOLD):
+    regressions = []
+    for tier, stages in results.items():
+        for name, current in stages.items():
+            previous = baseline.get("tiers", {}).get(tier, {}).get(name)
+            if not previous or "seconds" not in current or "seconds" not in previous:
+                continue
+            if current["seconds"] > previous["seconds"] * (1 + threshold):
+                regressions.append(f"{tier}/{name}: {previous['seconds']}s → {current['seconds']}s")
+            if current["peak_mb"] > previous["peak_mb"] * (1 + threshold) + MEMORY_SLACK_MB:
+                regressions.append(f"{tier}/{name}: {previous['peak_mb']} MB → {current['peak_mb']} MB peak")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the OptiML pipeline stages on synthetic datasets.")
+    parser.add_argument("--tiers", nargs="+", default=["small", "medium"], choices=list(TIERS))
+    parser.add_argument("--stages", nargs="+", default=STAGES, choices=STAGES)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument("--baseline", help="Baseline JSON file to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="Write the results to --baseline instead of comparing")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD)
+    args = parser.parse_args()
+
+    results = {}
+    for tier in args.tiers:
+        results[tier] = run_tier(tier, args.stages, args.repeat, args.workers, args.seed, args.data_dir)
+        for name, result in results[tier].items():
+            if "skipped" in result:
+                print(f"{tier:>6} {name:<10} skipped ({result['skipped']})", flush=True)
+            else:
+                print(f"{tier:>6} {name:<10} {result['seconds']:>9.3f}s {result['rows_per_second']:>14,.0f} rows/s "
+                      f"{result['peak_mb']:>9.1f} MB peak", flush=True)
+
+    report = {"environment": environment(), "seed": args.seed, "tiers": results}
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=4)
+
+    if args.baseline and args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=4)
+        print(f"Baseline written to {args.baseline}")
+    elif args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare_to_baseline(results, baseline, args.threshold)
+        if regressions:
+            print(f"Regressions beyond {args.threshold:.0%}:")
+            for regression in regressions:
+                print(f"- {regression}")
+            sys.exit(1)
+        print(f"No regressions beyond {args.threshold:.0%} against {args.baseline}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+
+MAX_POINTS = 5000
+MAX_LINE_POINTS = 2000
+MAX_BARS = 200
+HISTOGRAM_BINS = 100
+
+def selected_columns(*cols):
+    return list(dict.fromkeys(cols))
+
+def sample_points(df, cols, cap=MAX_POINTS, random_state=0):
+    data = df[selected_columns(*cols)]
+    if len(data) > cap:
+        data = data.sample(n=cap, random_state=random_state)
+    return data
+
+def lttb(x, y, threshold):
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    anchor = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+        area = np.abs((x[anchor] - avg_x) * (y[start:end] - y[anchor]) - (x[anchor] - x[start:end]) * (avg_y - y[anchor]))
+        anchor = start + int(np.argmax(area)) if end > start else start
+        selected[i + 1] = anchor
+    return selected
+
+def downsample_line(df, x, y, cap=MAX_LINE_POINTS):
+    data = df[selected_columns(x, y)].dropna()
+    if len(data) <= cap:
+        return df[selected_columns(x, y)]
+    data = data.sort_values(x)
+    keep = lttb(data[x].to_numpy(dtype=float), data[y].to_numpy(dtype=float), cap)
+    return data.iloc[keep]
+
+def count_groups(df, cols):
+    return df.groupby(selected_columns(*cols), observed=True).size().reset_index(name="count")
+
+def binned(series, bins):
+    edges = np.histogram_bin_edges(series.dropna().to_numpy(dtype=float), bins=bins)
+    centers = (edges[:-1] + edges[1:]) / 2
+    return pd.cut(series, edges, include_lowest=True, labels=centers).astype(float)
+
+def aggregate_by_category(df, x, y, x_numeric, y_numeric):
+    if x == y:
+        return count_groups(df, [x]), x, "count", None
+    if x_numeric and y_numeric:
+        keys = df[x] if df[x].nunique() <= MAX_BARS else binned(df[x], MAX_BARS)
+        return df.groupby(keys)[y].sum().reset_index(), x, y, None
+    if y_numeric:
+        return df.groupby(x, observed=True)[y].sum().reset_index(), x, y, None
+    if x_numeric:
+        return df.groupby(y, observed=True)[x].sum().reset_index(), x, y, None
+    return count_groups(df, [x, y]), x, "count", y
+
+def histogram_counts(series, bins=HISTOGRAM_BINS):
+    values = series.dropna().to_numpy(dtype=float)
+    counts, edges = np.histogram(values, bins=min(len(np.histogram_bin_edges(values, bins="auto")) - 1, bins))
+    return pd.DataFrame({
+        series.name: (edges[:-1] + edges[1:]) / 2,
+        "count": counts,
+        "width": np.diff(edges),
+    })
+
+def bin_2d(df, x, y, bins=HISTOGRAM_BINS):
+    data = df[[x, y]].dropna()
+    counts, x_edges, y_edges = np.histogram2d(data[x].to_numpy(dtype=float), data[y].to_numpy(dtype=float), bins=bins)
+    x_centers = (x_edges[:-1] + x_edges[1:]) / 2
+    y_centers = (y_edges[:-1] + y_edges[1:]) / 2
+    grid_x, grid_y = np.meshgrid(x_centers, y_centers, indexing="ij")
+    binned_df = pd.DataFrame({x: grid_x.ravel(), y: grid_y.ravel(), "count": counts.ravel()})
+    return binned_df[binned_df["count"] > 0]
@@ -1,12 +1,37 @@
 import numpy as np
+from datacache import cached
 
-def detect_variable_type(df, col):
-    unique_values = df[col].dropna().unique()
-    if len(unique_values) == 2:
+def classify_variable(dtype, distinct):
+    if distinct == 2:
         return "Binary"
-    elif df[col].dtype == "object" or df[col].dtype.name == "category":
-        return "Categorical" if len(unique_values) < 50 else "Text"
-    elif np.issubdtype(df[col].dtype, np.number):
+    elif dtype == "object" or dtype.name in ("category", "string"):
+        return "Categorical" if distinct < 50 else "Text"
+    elif isinstance(dtype, np.dtype) and np.issubdtype(dtype, np.number):
         return "Numeric"
     else:
-        return "Text"
\ No newline at end of file
+        return "Text"
+
+def capped_distinct(series):
+    dtype = series.dtype
+    if not (isinstance(dtype, np.dtype) and (np.issubdtype(dtype, np.number) or dtype == bool)):
+        return series.nunique()
+    values = series.to_numpy()
+    if np.issubdtype(dtype, np.floating):
+        values = values[~np.isnan(values)]
+    if len(values) == 0:
+        return 0
+    others = values[values != values[0]]
+    if len(others) == 0:
+        return 1
+    return 2 if (others == others[0]).all() else 3
+
+@cached
+def variable_types(df, stats=None):
+    if stats is not None:
+        return stats["type"].to_dict()
+    return {col: classify_variable(df[col].dtype, capped_distinct(df[col])) for col in df.columns}
+
+def detect_variable_type(df, col, stats=None):
+    if stats is not None:
+        return stats.loc[col, "type"]
+    return classify_variable(df[col].dtype, capped_distinct(df[col]))
\ No newline at end of file
@@ -0,0 +1,77 @@
+import warnings
+import numpy as np
+import pandas as pd
+from col_datatype import classify_variable
+from datacache import cached
+from sketches import frame_sketches
+from perftrace import traced
+
+NUMERIC_STATS = ["mean", "min", "max", "zeros", "negatives", "infinite"]
+
+def numeric_block_stats(df, block_size=64):
+    numeric_cols = df.select_dtypes(include="number").columns
+    results = []
+    for start in range(0, len(numeric_cols), block_size):
+        cols = numeric_cols[start:start + block_size]
+        values = df[cols].to_numpy(dtype=np.float64, na_value=np.nan)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", category=RuntimeWarning)
+            block = pd.DataFrame({
+                "mean": np.nanmean(values, axis=0),
+                "min": np.nanmin(values, axis=0) if len(values) else np.nan,
+                "max": np.nanmax(values, axis=0) if len(values) else np.nan,
+                "zeros": (values == 0).sum(axis=0),
+                "negatives": (values < 0).sum(axis=0),
+                "infinite": np.isinf(values).sum(axis=0),
+            }, index=cols)
+        results.append(block)
+    if not results:
+        return pd.DataFrame(columns=NUMERIC_STATS, dtype=float)
+    return pd.concat(results)
+
+@traced("profile.column_stats")
+@cached
+def column_stats(df, approximate=False):
+    stats = pd.DataFrame(index=df.columns)
+    stats["dtype"] = df.dtypes
+    stats["missing"] = df.isna().sum()
+    if approximate:
+        distinct = frame_sketches(df)["distinct"]
+        stats["distinct"] = [distinct[col].estimate() for col in df.columns]
+        stats["distinct_error"] = [distinct[col].relative_error for col in df.columns]
+    else:
+        stats["distinct"] = df.nunique()
+    stats["memory"] = df.memory_usage(deep=True, index=False)
+    stats = stats.join(numeric_block_stats(df))
+    stats[["zeros", "negatives", "infinite"]] = stats[["zeros", "negatives", "infinite"]].astype("Int64")
+    stats["type"] = [classify_variable(dtype, distinct) for dtype, distinct in zip(stats["dtype"], stats["distinct"])]
+    return stats
+
+def overview_stats(rows, cols, missing, duplicates, memory, duplicate_error=None):
+    overview = {
+        "Number of variables": cols,
+        "Number of observations": rows,
+        "Missing cells": missing,
+        "Missing cells (%)": (missing / (rows * cols)) * 100 if rows * cols else 0.0,
+        "Duplicate rows": duplicates,
+        "Duplicate rows (%)": (duplicates / rows) * 100 if rows else 0.0,
+        "Total size in memory": f"{memory / 1024**2:.2f} MB",
+        "Average record size in memory": f"{memory / rows if rows else 0:.2f} bytes",
+    }
+    if duplicate_error is not None:
+        overview["Duplicate rows"] = f"≈ {duplicates:,} ± {duplicate_error * rows:,.0f}"
+        overview["Duplicate rows (%)"] = f"≈ {overview['Duplicate rows (%)']:.2f} ± {duplicate_error * 100:.2f}"
+    return overview
+
+@traced("profile.dataset_stats")
+@cached
+def dataset_stats(df, stats=None, approximate=False):
+    if stats is None:
+        stats = column_stats(df, approximate=approximate)
+    rows, cols = df.shape
+    missing = int(stats["missing"].sum())
+    memory = stats["memory"].sum() + df.index.memory_usage(deep=True)
+    if approximate:
+        duplicates = frame_sketches(df)["duplicates"]
+        return overview_stats(rows, cols, missing, duplicates.estimate(), memory, duplicates.rate_error())
+    return overview_stats(rows, cols, missing, int(df.duplicated().sum()), memory)
@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_numeric_dtype
+from col_datatype import variable_types
+from datacache import cached
+from perftrace import traced
+
+def correlation_inputs(df, sample_rows=None, random_state=0):
+    column_types = variable_types(df)
+    if sample_rows and len(df) > sample_rows:
+        df = df.sample(n=sample_rows, random_state=random_state)
+
+    columns = []
+    for col in sorted(df.columns):
+        if column_types[col] in ("Categorical", "Binary") or is_numeric_dtype(df[col].dtype):
+            columns.append(col)
+
+    values = np.empty((len(df), len(columns)), dtype=np.float32)
+    for i, col in enumerate(columns):
+        if column_types[col] in ("Categorical", "Binary"):
+            codes = df[col].astype("category").cat.codes.to_numpy()
+            values[:, i] = np.where(codes < 0, np.nan, codes)
+        else:
+            values[:, i] = df[col].to_numpy(dtype=np.float32, na_value=np.nan)
+    values[~np.isfinite(values)] = np.nan
+    return columns, values
+
+def rank_columns(values):
+    return pd.DataFrame(values).rank().to_numpy(dtype=np.float32)
+
+def pearson_blas(values):
+    mask = ~np.isnan(values)
+    centered = values - np.nanmean(values, axis=0)
+    if mask.all():
+        counts = np.full((values.shape[1], values.shape[1]), len(values), dtype=np.float32)
+        scaled = centered / np.linalg.norm(centered, axis=0)
+        return scaled.T @ scaled, counts
+
+    weights = mask.astype(np.float32)
+    centered = np.where(mask, centered, 0).astype(np.float32)
+    counts = weights.T @ weights
+    sums = centered.T @ weights
+    squares = (centered * centered).T @ weights
+    products = centered.T @ centered
+    covariance = counts * products - sums * sums.T
+    spread = counts * squares - sums * sums
+    return covariance / np.sqrt(spread * spread.T), counts
+
+@traced("profile.correlations")
+@cached
+def correlation_matrix(df, method="pearson", sample_rows=None):
+    columns, values = correlation_inputs(df, sample_rows)
+    if not columns:
+        return None, None
+    if method == "spearman":
+        values = rank_columns(values)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        corr, counts = pearson_blas(values)
+    corr = np.clip(corr, -1, 1)
+    return pd.DataFrame(corr, index=columns, columns=columns), pd.DataFrame(counts, index=columns, columns=columns)
+
+def confidence_bounds(corr, counts, method="pearson", z=1.96):
+    scale = np.sqrt(1.06) if method == "spearman" else 1.0
+    with np.errstate(invalid="ignore", divide="ignore"):
+        fisher = np.arctanh(np.clip(corr, -0.999999, 0.999999))
+        error = scale * z / np.sqrt(np.maximum(counts - 3, 1))
+    return np.tanh(fisher - error), np.tanh(fisher + error)
+
+def top_pairs(corr, counts=None, k=20, threshold=0.0, method="pearson"):
+    values = corr.to_numpy()
+    rows, cols = np.triu_indices(len(values), k=1)
+    pair_values = values[rows, cols]
+    strength = np.abs(np.nan_to_num(pair_values, nan=0.0))
+    keep = np.flatnonzero(strength >= threshold)
+    if k and len(keep) > k:
+        keep = keep[np.argpartition(-strength[keep], k - 1)[:k]]
+    keep = keep[np.argsort(-strength[keep])]
+
+    pairs = pd.DataFrame({
+        "Variable 1": corr.index[rows[keep]],
+        "Variable 2": corr.columns[cols[keep]],
+        "Correlation": pair_values[keep],
+    })
+    if counts is not None:
+        lower, upper = confidence_bounds(pair_values[keep], counts.to_numpy()[rows[keep], cols[keep]], method)
+        pairs["Lower (95%)"] = lower
+        pairs["Upper (95%)"] = upper
+    return pairs
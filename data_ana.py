@@ -1,11 +1,14 @@
 import streamlit as st
 import plotly.express as px
-from col_datatype import detect_variable_type
+from col_datatype import variable_types
+from chartdata import (
+    HISTOGRAM_BINS, MAX_POINTS, aggregate_by_category, bin_2d, count_groups, downsample_line, histogram_counts, sample_points,
+)
 
 def data_analysis_section(df):
     st.subheader("Data Analysis")
 
-    column_types = {col: detect_variable_type(df, col) for col in df.columns}
+    column_types = variable_types(df)
     columns_with_types = [f"{col} ({col_type})" for col, col_type in column_types.items() if col_type != "Text"]
     col_name_map = {f"{col} ({col_type})": col for col, col_type in column_types.items() if col_type != "Text"}
 
@@ -19,8 +22,8 @@ def data_analysis_section(df):
         selected_x_col = col_name_map.get(selected_x_display)
         selected_y_col = col_name_map.get(selected_y_display)
 
-        type_x = detect_variable_type(df, selected_x_col)
-        type_y = detect_variable_type(df, selected_y_col)
+        type_x = column_types[selected_x_col]
+        type_y = column_types[selected_y_col]
 
         chart_options = {
             ("Numeric", "Numeric"): ["Scatter", "Bar", "Line", "Bubble", "Histogram"],
@@ -34,30 +37,43 @@ def data_analysis_section(df):
         if available_charts:
             chart_type = st.selectbox(f"Choose chart type for {selected_x_col} vs {selected_y_col}", available_charts)
 
+            x_numeric, y_numeric = type_x == "Numeric", type_y == "Numeric"
+
             if chart_type == "Scatter":
                 st.write(f"Scatter Plot between {selected_x_col} and {selected_y_col}")
-                st.plotly_chart(px.scatter(df, x=selected_x_col, y=selected_y_col, color=selected_y_col), use_container_width=True)
+                if x_numeric and y_numeric and len(df) > MAX_POINTS and st.checkbox("Show as density heatmap"):
+                    plot_df = bin_2d(df, selected_x_col, selected_y_col)
+                    st.plotly_chart(px.density_heatmap(plot_df, x=selected_x_col, y=selected_y_col, z="count",
+                                                       histfunc="sum", nbinsx=HISTOGRAM_BINS, nbinsy=HISTOGRAM_BINS),
+                                    use_container_width=True)
+                else:
+                    plot_df = sample_points(df, [selected_x_col, selected_y_col])
+                    st.plotly_chart(px.scatter(plot_df, x=selected_x_col, y=selected_y_col, color=selected_y_col), use_container_width=True)
 
             elif chart_type == "Bar":
                 st.write(f"Bar Chart between {selected_x_col} and {selected_y_col}")
-                st.plotly_chart(px.bar(df, x=selected_x_col, y=selected_y_col), use_container_width=True)
+                plot_df, bar_x, bar_y, color = aggregate_by_category(df, selected_x_col, selected_y_col, x_numeric, y_numeric)
+                st.plotly_chart(px.bar(plot_df, x=bar_x, y=bar_y, color=color), use_container_width=True)
 
             elif chart_type == "Line":
                 st.write(f"Line Chart between {selected_x_col} and {selected_y_col}")
-                st.plotly_chart(px.line(df, x=selected_x_col, y=selected_y_col), use_container_width=True)
+                plot_df = downsample_line(df, selected_x_col, selected_y_col)
+                st.plotly_chart(px.line(plot_df, x=selected_x_col, y=selected_y_col), use_container_width=True)
 
             elif chart_type == "Pie":
                 st.write(f"Multiple Pie Charts grouped by {selected_x_col} and segmented by {selected_y_col}")
+                plot_df = count_groups(df, [selected_x_col, selected_y_col])
                 fig = px.pie(
-                    df,
+                    plot_df,
                     names=selected_y_col,
+                    values="count",
                     facet_col=selected_x_col,
                     facet_col_wrap=3,
                     title=f"Pie charts for each {selected_x_col}"
                 )
                 fig.update_layout(
                     margin=dict(t=40, b=40),
-                    height=((len(df[selected_x_col].unique()) // 3 + 1) * 300),
+                    height=((plot_df[selected_x_col].nunique() // 3 + 1) * 300),
                     grid=dict(rows=1, columns=3),
                     uniformtext_minsize=12,
                     uniformtext_mode='hide'
@@ -67,23 +83,35 @@ def data_analysis_section(df):
 
             elif chart_type == "Histogram":
                 st.write(f"Histogram for {selected_x_col}")
-                st.plotly_chart(px.histogram(df, x=selected_x_col), use_container_width=True)
+                plot_df = histogram_counts(df[selected_x_col])
+                fig = px.bar(plot_df, x=selected_x_col, y="count")
+                fig.update_traces(width=plot_df["width"])
+                fig.update_layout(bargap=0)
+                st.plotly_chart(fig, use_container_width=True)
 
             elif chart_type == "Treemap":
                 st.write(f"Treemap between {selected_x_col} and {selected_y_col}")
-                st.plotly_chart(px.treemap(df, path=[selected_x_col, selected_y_col]), use_container_width=True)
+                plot_df = count_groups(df, [selected_x_col, selected_y_col])
+                st.plotly_chart(px.treemap(plot_df, path=[selected_x_col, selected_y_col], values="count"), use_container_width=True)
 
             elif chart_type == "Funnel":
                 st.write(f"Funnel Chart between {selected_x_col} and {selected_y_col}")
-                st.plotly_chart(px.funnel(df, x=selected_x_col, y=selected_y_col), use_container_width=True)
+                plot_df, funnel_x, funnel_y, color = aggregate_by_category(df, selected_x_col, selected_y_col, x_numeric, y_numeric)
+                if color is not None:
+                    funnel_x, funnel_y = funnel_y, funnel_x
+                st.plotly_chart(px.funnel(plot_df, x=funnel_x, y=funnel_y, color=color), use_container_width=True)
 
             elif chart_type == "Bubble":
                 st.write(f"Bubble Chart between {selected_x_col} and {selected_y_col}")
-                st.plotly_chart(px.scatter(df, x=selected_x_col, y=selected_y_col, size=selected_y_col), use_container_width=True)
+                plot_df = sample_points(df, [selected_x_col, selected_y_col])
+                st.plotly_chart(px.scatter(plot_df, x=selected_x_col, y=selected_y_col, size=selected_y_col), use_container_width=True)
 
             elif chart_type == "Sankey":
                 st.write(f"Sankey Chart between {selected_x_col} and {selected_y_col}")
-                fig = px.sunburst(df, path=[selected_x_col, selected_y_col])
+                plot_df = count_groups(df, [selected_x_col, selected_y_col])
+                fig = px.sunburst(plot_df, path=[selected_x_col, selected_y_col], values="count")
                 st.plotly_chart(fig)
+
+            st.caption(f"Rendered {len(plot_df):,} points from {len(df):,} rows")
         else:
             st.warning("No suitable chart types available for the selected columns.")
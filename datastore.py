@@ -0,0 +1,187 @@
+import copy
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import threading
+import time
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from autocleandata import RowHashes
+from perftrace import traced
+
+STORE_DIR = os.environ.get("OPTIML_STORE_DIR", ".optiml_store")
+CATALOG_FILE = "catalog.json"
+CLEANER_FILE = "cleaner.pkl"
+HASHES_DIR = "row_hashes"
+
+_catalog_lock = threading.Lock()
+
+def source_fingerprint(datafile, block_size=8 * 1024**2):
+    digest = hashlib.blake2b(digest_size=16)
+    position = datafile.tell()
+    datafile.seek(0)
+    for block in iter(lambda: datafile.read(block_size), b""):
+        digest.update(block)
+    datafile.seek(position)
+    return digest.hexdigest()
+
+def dataset_path(key, kind, root=STORE_DIR):
+    return os.path.join(root, key, f"{kind}.parquet")
+
+def parts_dir(key, kind, root=STORE_DIR):
+    return os.path.join(root, key, f"{kind}.parts")
+
+def dataset_files(key, kind, root=STORE_DIR):
+    directory = parts_dir(key, kind, root)
+    parts = sorted(os.listdir(directory)) if os.path.isdir(directory) else []
+    return [dataset_path(key, kind, root)] + [os.path.join(directory, name) for name in parts if name.endswith(".parquet")]
+
+def has_parts(key, kind, root=STORE_DIR):
+    return len(dataset_files(key, kind, root)) > 1
+
+def load_catalog(root=STORE_DIR):
+    path = os.path.join(root, CATALOG_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+def save_catalog(catalog, root=STORE_DIR):
+    os.makedirs(root, exist_ok=True)
+    path = os.path.join(root, CATALOG_FILE)
+    with open(f"{path}.tmp", "w") as f:
+        json.dump(catalog, f, indent=4)
+    os.replace(f"{path}.tmp", path)
+
+def arrow_table(df):
+    try:
+        return pa.Table.from_pandas(df, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        df = df.copy()
+        for col in df.select_dtypes(include=[object]).columns:
+            df[col] = df[col].map(lambda value: value if isinstance(value, str) or pd.isna(value) else str(value))
+        return pa.Table.from_pandas(df, preserve_index=False)
+
+def has_dataset(key, kind="original", root=STORE_DIR):
+    return os.path.exists(dataset_path(key, kind, root))
+
+@traced("store.save")
+def save_dataset(df, key, kind="original", name=None, root=STORE_DIR):
+    path = dataset_path(key, kind, root)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    pq.write_table(arrow_table(df), f"{path}.tmp")
+    os.replace(f"{path}.tmp", path)
+    shutil.rmtree(parts_dir(key, kind, root), ignore_errors=True)
+
+    record_dataset(key, kind, len(df), df.shape[1], name, root)
+    return path
+
+# Appended batches become part files next to the stored dataset, so an append writes only
+# the new rows; a batch whose types do not fit the stored schema rewrites the dataset once.
+@traced("store.append")
+def append_dataset(df, key, kind="original", root=STORE_DIR):
+    if len(df) == 0:
+        return None
+    schema = pq.read_schema(dataset_path(key, kind, root))
+    try:
+        table = arrow_table(df).select(schema.names).cast(schema)
+    except (KeyError, pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+        return save_dataset(pd.concat([load_dataset(key, kind, root), df], ignore_index=True), key, kind, root=root)
+
+    directory = parts_dir(key, kind, root)
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"part-{len(dataset_files(key, kind, root)):06d}.parquet")
+    pq.write_table(table, f"{path}.tmp")
+    os.replace(f"{path}.tmp", path)
+
+    rows = sum(pq.ParquetFile(part).metadata.num_rows for part in dataset_files(key, kind, root))
+    record_dataset(key, kind, rows, len(schema.names), root=root)
+    return path
+
+def record_dataset(key, kind, rows, columns, name=None, root=STORE_DIR):
+    with _catalog_lock:
+        catalog = load_catalog(root)
+        entry = catalog.setdefault(key, {"name": name or key, "created": time.strftime("%Y-%m-%d %H:%M:%S"), "kinds": {}})
+        if name:
+            entry["name"] = name
+        entry["kinds"][kind] = {
+            "rows": rows,
+            "columns": columns,
+            "bytes": sum(os.path.getsize(path) for path in dataset_files(key, kind, root)),
+            "saved": time.strftime("%Y-%m-%d %H:%M:%S"),
+        }
+        save_catalog(catalog, root)
+
+@traced("store.load")
+def load_dataset(key, kind="original", root=STORE_DIR):
+    tables = [pq.read_table(path, memory_map=True) for path in dataset_files(key, kind, root)]
+    return pa.concat_tables(tables).to_pandas()
+
+def list_datasets(root=STORE_DIR):
+    catalog = load_catalog(root)
+    return {key: entry for key, entry in catalog.items() if has_dataset(key, "original", root)}
+
+def write_hashes(directory, batches):
+    os.makedirs(directory, exist_ok=True)
+    start = len(os.listdir(directory))
+    for number, hashes in enumerate(batches, start):
+        path = os.path.join(directory, f"{number:06d}.npy")
+        with open(f"{path}.tmp", "wb") as f:
+            np.save(f, hashes)
+        os.replace(f"{path}.tmp", path)
+
+# Row hashes are stored as one array per batch beside the pickled statistics, so saving
+# after an append writes only the new hashes and the small running totals.
+def save_cleaner(cleaner, key, root=STORE_DIR, append=False):
+    directory = os.path.join(root, key, HASHES_DIR)
+    if append and os.path.isdir(directory):
+        write_hashes(directory, cleaner.unsaved_hashes)
+    else:
+        shutil.rmtree(directory, ignore_errors=True)
+        write_hashes(directory, cleaner.row_hashes.segments)
+    cleaner.unsaved_hashes = []
+
+    state = copy.copy(cleaner)
+    state.row_hashes = RowHashes()
+    path = os.path.join(root, key, CLEANER_FILE)
+    with open(f"{path}.tmp", "wb") as f:
+        pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(f"{path}.tmp", path)
+
+def load_cleaner(key, root=STORE_DIR):
+    path = os.path.join(root, key, CLEANER_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as f:
+        cleaner = pickle.load(f)
+    directory = os.path.join(root, key, HASHES_DIR)
+    if os.path.isdir(directory):
+        for name in sorted(os.listdir(directory)):
+            if name.endswith(".npy"):
+                cleaner.row_hashes.add(np.load(os.path.join(directory, name)))
+    cleaner.unsaved_hashes = []
+    return cleaner
+
+def delete_dataset(key, root=STORE_DIR):
+    with _catalog_lock:
+        catalog = load_catalog(root)
+        catalog.pop(key, None)
+        save_catalog(catalog, root)
+    for kind in ("original", "cleaned"):
+        if has_dataset(key, kind, root):
+            os.remove(dataset_path(key, kind, root))
+        shutil.rmtree(parts_dir(key, kind, root), ignore_errors=True)
+    if os.path.exists(os.path.join(root, key, CLEANER_FILE)):
+        os.remove(os.path.join(root, key, CLEANER_FILE))
+    shutil.rmtree(os.path.join(root, key, HASHES_DIR), ignore_errors=True)
+    if os.path.isdir(os.path.join(root, key)):
+        os.rmdir(os.path.join(root, key))
+
+def parquet_bytes(df):
+    sink = pa.BufferOutputStream()
+    pq.write_table(arrow_table(df), sink)
+    return sink.getvalue().to_pybytes()
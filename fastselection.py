@@ -0,0 +1,122 @@
+import math
+import time
+import numpy as np
+import pandas as pd
+from modelscheduler import SORT_METRICS, cached_comparison, compare_models_parallel, pycaret_module
+from traincache import training_key
+
+def stratified_sample(df, target, n, task, bins=10, min_per_group=10, random_state=1):
+    if n >= len(df):
+        return df
+    if task == "classification":
+        groups = df[target]
+    else:
+        groups = pd.qcut(df[target].rank(method="first"), q=bins, labels=False)
+    codes = pd.Series(pd.factorize(groups)[0])
+
+    order = np.random.default_rng(random_state).permutation(len(df))
+    shuffled = codes.iloc[order].reset_index(drop=True)
+    position = shuffled.groupby(shuffled).cumcount()
+    sizes = shuffled.map(shuffled.value_counts())
+    quota = np.maximum(np.ceil(sizes * n / len(df)), min_per_group)
+    keep = order[(position < quota).to_numpy()]
+    return df.iloc[np.sort(keep)]
+
+def finished_models(compare_df):
+    if "Status" in compare_df.columns:
+        return compare_df[compare_df["Status"] == "Done"]
+    return compare_df
+
+def run_round(df, target, task, setup_kwargs, candidates, workers, model_timeout, cache=None, preprocessing=None,
+              target_score=None):
+    key = training_key(df, target, task, setup_kwargs, preprocessing) if cache is not None else None
+    entries = cache.cached_comparison(key, candidates, model_timeout) if cache is not None else None
+    start = time.time()
+    if entries:
+        best_model, compare_df = cached_comparison(task, entries)
+        return best_model, compare_df, time.time() - start
+
+    pycaret_module(task).setup(df, target=target, verbose=False, **setup_kwargs)
+    start = time.time()
+    best_model, compare_df = compare_models_parallel(
+        task, workers=workers, model_timeout=model_timeout, target_score=target_score, include=candidates,
+        cache=cache, cache_key=key,
+    )
+    return best_model, compare_df, time.time() - start
+
+def estimated_score_gap(rounds, winner_id, metric):
+    gaps = []
+    for round_info in rounds[:-1]:
+        finished = finished_models(round_info["table"])
+        if metric not in finished.columns or winner_id not in finished.index:
+            continue
+        eliminated = finished.drop(index=round_info["kept"])
+        if not eliminated.empty:
+            gaps.append(eliminated[metric].max() - finished.loc[winner_id, metric])
+    # models eliminated below the winner cannot have cost any score
+    return max(0.0, max(gaps)) if gaps else 0.0
+
+def successive_halving(df, target, task, setup_kwargs, min_rows=5000, eta=3, workers=None,
+                       model_timeout=None, compare_full=False, on_round=None, cache=None, preprocessing=None,
+                       target_score=None):
+    metric = SORT_METRICS[task]
+    start = time.time()
+    candidates = None
+    rounds = []
+    extrapolated = {}
+    rows = min_rows
+
+    while (candidates is None or len(candidates) > 1) and rows < len(df):
+        sample = stratified_sample(df, target, rows, task)
+        _, compare_df, seconds = run_round(
+            sample, target, task, setup_kwargs, candidates, workers, model_timeout, cache, preprocessing,
+        )
+        finished = finished_models(compare_df)
+        if finished.empty:
+            break
+        for model_id, row in finished.iterrows():
+            extrapolated[model_id] = row.get("TT (Sec)", 0.0) * len(df) / len(sample)
+
+        entrants = len(candidates) if candidates is not None else len(compare_df)
+        candidates = list(finished.index[:max(1, math.ceil(entrants / eta))])
+        rounds.append({"rows": len(sample), "candidates": entrants, "kept": candidates,
+                       "seconds": round(seconds, 2), "table": compare_df})
+        if on_round is not None:
+            on_round(rounds[-1])
+        rows *= eta
+
+    # sampled rounds only rank candidates, so a target score can stop the full-data round alone
+    best_model, compare_df, seconds = run_round(
+        df, target, task, setup_kwargs, candidates, workers, model_timeout, cache, preprocessing, target_score,
+    )
+    finished = finished_models(compare_df)
+    rounds.append({"rows": len(df), "candidates": len(compare_df), "kept": list(finished.index[:1]),
+                   "seconds": round(seconds, 2), "table": compare_df})
+    if on_round is not None:
+        on_round(rounds[-1])
+    elapsed = time.time() - start
+
+    has_score = metric in finished.columns and not finished.empty
+    winner_score = finished[metric].iloc[0] if has_score else None
+    report = {
+        "metric": metric,
+        "rounds": rounds,
+        "seconds": round(elapsed, 2),
+        "winner_score": winner_score,
+        "estimated": not compare_full,
+    }
+
+    if compare_full:
+        _, full_df, full_seconds = run_round(df, target, task, setup_kwargs, None, workers, model_timeout)
+        full_finished = finished_models(full_df)
+        if has_score and metric in full_finished.columns and not full_finished.empty:
+            report["score_gap"] = full_finished[metric].iloc[0] - winner_score
+    else:
+        for model_id, row in finished.iterrows():
+            extrapolated[model_id] = row.get("TT (Sec)", 0.0)
+        full_seconds = sum(extrapolated.values())
+        if has_score:
+            report["score_gap"] = estimated_score_gap(rounds, finished.index[0], metric)
+    report["full_seconds"] = round(full_seconds, 2)
+    report["time_saved"] = round(full_seconds - elapsed, 2)
+    return best_model, compare_df, report
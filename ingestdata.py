@@ -0,0 +1,124 @@
+import os
+import pandas as pd
+from pandas.api.types import is_float_dtype, is_integer_dtype, is_numeric_dtype, is_object_dtype, union_categoricals
+from perftrace import traced
+
+try:
+    import pyarrow  # noqa: F401
+    STRING_DTYPE = "string[pyarrow]"
+except ImportError:
+    STRING_DTYPE = None
+
+def file_size(handle):
+    position = handle.tell()
+    handle.seek(0, os.SEEK_END)
+    size = handle.tell()
+    handle.seek(position)
+    return size
+
+def plan_dtypes(chunk, category_ratio=0.5):
+    plan = {}
+    for col in chunk.columns:
+        dtype = chunk[col].dtype
+        if is_integer_dtype(dtype):
+            plan[col] = "integer"
+        elif is_float_dtype(dtype):
+            plan[col] = "float"
+        elif is_object_dtype(dtype):
+            if chunk[col].nunique() <= category_ratio * len(chunk):
+                plan[col] = "category"
+            elif STRING_DTYPE is not None:
+                plan[col] = "string"
+    return plan
+
+def as_text(series):
+    text = series.astype(object).map(str, na_action="ignore")
+    return text.astype(STRING_DTYPE) if STRING_DTYPE is not None else text
+
+def plan_mismatches(chunk, plan):
+    mismatched = []
+    for col, kind in plan.items():
+        numeric = is_numeric_dtype(chunk[col].dtype)
+        if kind in ("integer", "float") and not numeric or kind in ("category", "string") and numeric:
+            mismatched.append(col)
+    return mismatched
+
+def downcast_chunk(chunk, plan):
+    for col, kind in plan.items():
+        series = chunk[col]
+        if kind == "text":
+            chunk[col] = as_text(series)
+        elif kind in ("integer", "float"):
+            if is_numeric_dtype(series.dtype):
+                chunk[col] = pd.to_numeric(series, downcast=kind)
+        elif is_object_dtype(series.dtype):
+            chunk[col] = series.astype("category" if kind == "category" else STRING_DTYPE)
+    return chunk
+
+def concat_chunks(chunks):
+    columns = chunks[0].columns
+    merged = {}
+    for col in columns:
+        parts = [chunk[col] for chunk in chunks]
+        if all(isinstance(part.dtype, pd.CategoricalDtype) for part in parts):
+            try:
+                merged[col] = pd.Series(union_categoricals(parts, ignore_order=True), name=col)
+                continue
+            except TypeError:
+                parts = [part.astype(object) for part in parts]
+        merged[col] = pd.concat(parts, ignore_index=True)
+    return pd.DataFrame(merged, columns=columns)
+
+@traced("ingest.read_csv")
+def read_csv_chunked(datacsv, chunksize=100_000, plan_chunks=1, progress_callback=None):
+    if isinstance(datacsv, (str, os.PathLike)):
+        with open(datacsv, "rb") as handle:
+            return read_csv_chunked(handle, chunksize, plan_chunks, progress_callback)
+
+    total_size = file_size(datacsv)
+    start = datacsv.tell()
+    chunks, plan_sample = [], []
+    plan = None
+    memory_before = 0
+
+    for chunk in pd.read_csv(datacsv, chunksize=chunksize):
+        memory_before += chunk.memory_usage(deep=True).sum()
+        if plan is None:
+            plan_sample.append(chunk)
+            if len(plan_sample) < plan_chunks:
+                continue
+            plan = plan_dtypes(pd.concat(plan_sample))
+            chunks.extend(downcast_chunk(sample, plan) for sample in plan_sample)
+        else:
+            # the plan comes from the first chunks; a column whose later values do not fit it is
+            # widened to text in every chunk instead of mixing numbers and strings
+            mismatched = plan_mismatches(chunk, plan)
+            if mismatched:
+                for col in mismatched:
+                    plan[col] = "text"
+                for previous in chunks:
+                    for col in mismatched:
+                        previous[col] = as_text(previous[col])
+            chunks.append(downcast_chunk(chunk, plan))
+        if progress_callback is not None and total_size:
+            progress_callback(min(datacsv.tell() / total_size, 1.0))
+
+    if plan is None and plan_sample:
+        plan = plan_dtypes(pd.concat(plan_sample))
+        chunks.extend(downcast_chunk(sample, plan) for sample in plan_sample)
+    if not chunks:
+        datacsv.seek(start)
+        df = pd.read_csv(datacsv)
+        memory = int(df.memory_usage(deep=True).sum())
+        return df, {"rows": 0, "chunks": 0, "memory_before": memory, "memory_after": memory}
+
+    df = concat_chunks(chunks)
+    if progress_callback is not None:
+        progress_callback(1.0)
+    report = {
+        "rows": len(df),
+        "chunks": len(chunks),
+        "memory_before": int(memory_before),
+        "memory_after": int(df.memory_usage(deep=True).sum()),
+    }
+    return df, report
@@ -0,0 +1,311 @@
+import multiprocessing as mp
+import os
+import pickle
+import signal
+import threading
+import time
+import traceback
+import uuid
+from multiprocessing.connection import wait
+
+JOBS_DIR = os.environ.get("OPTIML_JOBS_DIR", ".optiml_jobs")
+JOB_WORKERS = int(os.environ.get("OPTIML_JOB_WORKERS", 2))
+POLL_SECONDS = 0.2
+
+class Job:
+    def __init__(self, kind, name, owner=None):
+        self.id = uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.name = name
+        self.owner = owner
+        self.status = "queued"
+        self.stage = None
+        self.progress = None
+        self.error = None
+        self.summary = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.process = None
+        self.conn = None
+        self.task = None
+
+    @property
+    def active(self):
+        return self.status in ("queued", "running")
+
+    @property
+    def elapsed(self):
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.time()) - self.started
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "name": self.name,
+            "status": self.status,
+            "stage": self.stage,
+            "progress": self.progress,
+            "error": self.error,
+            "seconds": round(self.elapsed, 1),
+        }
+
+def run_job(func, args, kwargs, conn, result_path):
+    # each job leads its own process group, so cancelling it also stops the model workers it forks
+    os.setpgrp()
+
+    def progress(stage, fraction=None):
+        conn.send(("progress", (stage, fraction)))
+
+    try:
+        result = func(*args, progress=progress, **kwargs)
+        with open(f"{result_path}.tmp", "wb") as f:
+            pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(f"{result_path}.tmp", result_path)
+        conn.send(("done", result.get("summary") if isinstance(result, dict) else None))
+    except Exception as e:
+        conn.send(("failed", repr(e)))
+    finally:
+        conn.close()
+
+# Jobs run in forked processes rather than threads: cleaning and training are CPU bound, pycaret
+# keeps its experiment in module globals, and a process can be cancelled at any point. Each job
+# reports over its own pipe, so killing one mid-message cannot garble the others' events.
+class JobQueue:
+    def __init__(self, max_workers=JOB_WORKERS, root=JOBS_DIR):
+        self.max_workers = max_workers
+        self.root = root
+        self.jobs = {}
+        self.lock = threading.Lock()
+        self.context = mp.get_context("fork")
+        self.thread = None
+
+    def result_path(self, job_id):
+        return os.path.join(self.root, f"{job_id}.pkl")
+
+    def submit(self, kind, func, *args, name=None, owner=None, **kwargs):
+        job = Job(kind, name or kind, owner)
+        job.task = (func, args, kwargs)
+        with self.lock:
+            self.jobs[job.id] = job
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, daemon=True)
+                self.thread.start()
+        return job.id
+
+    def get(self, job_id):
+        return self.jobs.get(job_id)
+
+    def list(self, owner=None):
+        with self.lock:
+            jobs = [job for job in self.jobs.values() if owner is None or job.owner == owner]
+        return sorted(jobs, key=lambda job: job.created, reverse=True)
+
+    def cancel(self, job_id):
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is None or not job.active:
+                return False
+            job.status = "cancelled"
+            job.finished = time.time()
+            if job.process is not None:
+                self.stop(job)
+        return True
+
+    # The process group may not exist yet if the job has not reached setpgrp, so the job process
+    # itself is stopped as well; whatever it managed to write is removed.
+    def stop(self, job):
+        try:
+            os.killpg(job.process.pid, signal.SIGTERM)
+        except OSError:
+            job.process.terminate()
+        job.process.join(POLL_SECONDS * 10)
+        if job.process.is_alive():
+            job.process.kill()
+            job.process.join()
+        job.process = None
+        self.close(job)
+        for path in (self.result_path(job.id), f"{self.result_path(job.id)}.tmp"):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def close(self, job):
+        if job.conn is not None:
+            job.conn.close()
+            job.conn = None
+
+    def result(self, job_id):
+        job = self.jobs.get(job_id)
+        if job is None or job.status != "done":
+            return None
+        with open(self.result_path(job_id), "rb") as f:
+            return pickle.load(f)
+
+    def remove(self, job_id):
+        self.cancel(job_id)
+        with self.lock:
+            self.jobs.pop(job_id, None)
+        try:
+            os.remove(self.result_path(job_id))
+        except OSError:
+            pass
+
+    def start(self, job):
+        func, args, kwargs = job.task
+        job.task = None
+        job.status = "running"
+        job.started = time.time()
+        try:
+            os.makedirs(self.root, exist_ok=True)
+            job.conn, writer = self.context.Pipe(duplex=False)
+            job.process = self.context.Process(
+                target=run_job, args=(func, args, kwargs, writer, self.result_path(job.id)),
+            )
+            try:
+                job.process.start()
+            finally:
+                writer.close()
+        except Exception as e:
+            job.status = "failed"
+            job.error = repr(e)
+            job.finished = time.time()
+            job.process = None
+            self.close(job)
+
+    def receive(self, job):
+        try:
+            while job.conn.poll():
+                self.handle(job, *job.conn.recv())
+        except (EOFError, OSError):
+            self.close(job)
+
+    def handle(self, job, kind, payload):
+        if not job.active:
+            return
+        if kind == "progress":
+            job.stage, job.progress = payload
+        elif kind == "done":
+            job.status = "done"
+            job.summary = payload
+            job.finished = time.time()
+        elif kind == "failed":
+            job.status = "failed"
+            job.error = payload
+            job.finished = time.time()
+
+    def run(self):
+        while True:
+            try:
+                self.poll()
+            except Exception:
+                # the monitor serves every session, so one bad event must not stop it
+                traceback.print_exc()
+                time.sleep(POLL_SECONDS)
+
+    def poll(self):
+        with self.lock:
+            conns = [job.conn for job in self.jobs.values() if job.conn is not None]
+        if conns:
+            try:
+                wait(conns, timeout=POLL_SECONDS)
+            except (OSError, ValueError):
+                # a job was cancelled and its pipe closed while waiting
+                pass
+        else:
+            time.sleep(POLL_SECONDS)
+
+        with self.lock:
+            for job in list(self.jobs.values()):
+                if job.conn is not None:
+                    self.receive(job)
+                if job.process is None or job.process.is_alive():
+                    continue
+                if job.status == "running" and job.process.exitcode != 0:
+                    job.status = "failed"
+                    job.error = f"Job process exited with code {job.process.exitcode}"
+                    job.finished = time.time()
+                elif job.status == "running" and job.conn is None:
+                    job.status = "failed"
+                    job.error = "Job process exited without reporting a result"
+                    job.finished = time.time()
+                if job.status != "running":
+                    job.process = None
+                    self.close(job)
+            running = sum(job.status == "running" for job in self.jobs.values())
+            for job in sorted(self.jobs.values(), key=lambda job: job.created):
+                if running >= self.max_workers:
+                    break
+                if job.status == "queued":
+                    self.start(job)
+                    running += job.status == "running"
+
+job_queue = JobQueue()
+
+def clean_job(df, key=None, workers=None, progress=None):
+    from autocleandata import autocleandata
+    from datastore import save_cleaner, save_dataset
+
+    progress("clean")
+    cleaned, cleaner = autocleandata(df, workers)
+    summary = {"key": key, "rows": len(cleaned), "columns": cleaned.shape[1]}
+    if key is None:
+        return {"summary": summary, "cleaned": cleaned, "cleaner": cleaner}
+    # the stored dataset is the result, so the frame is not pickled a second time
+    progress("save")
+    save_dataset(cleaned, key, "cleaned")
+    save_cleaner(cleaner, key)
+    return {"summary": summary}
+
+def profile_job(df, approximate=False, progress=None):
+    from col_stats import column_stats, dataset_stats
+    from correlations import correlation_matrix, top_pairs
+
+    progress("column statistics", 0.0)
+    stats = column_stats(df, approximate=approximate)
+    progress("dataset statistics", 0.4)
+    overview = dataset_stats(df, stats, approximate=approximate)
+    progress("correlations", 0.6)
+    corr, counts = correlation_matrix(df)
+    return {
+        "summary": {"overview": overview},
+        "stats": stats,
+        "correlations": None if corr is None else top_pairs(corr, counts),
+    }
+
+def train_job(df, target, target_type, workers=None, model_timeout=None, target_score=None, fast_selection=False,
+              lean=False, approximate=False, package_format="pickle", use_cache=True, progress=None):
+    from col_datatype import variable_types
+    from modeltraining import (
+        build_package, create_model_inputs, prepare_training_data, preprocessing_config, train_model,
+    )
+    from traincache import training_cache
+
+    progress("preprocess")
+    model_inputs = create_model_inputs(df, target, variable_types(df))
+    df, pipeline = prepare_training_data(df, target, target_type, lean=lean, approximate=approximate)
+
+    def model_finished(model_id, row, compare_df):
+        progress(f"train ({len(compare_df)} models finished)")
+
+    def round_finished(round_info):
+        progress(f"train ({round_info['candidates']} candidates on {round_info['rows']:,} rows finished)")
+
+    progress("setup")
+    best_model, compare_df, report = train_model(
+        df, target_type, target, workers=workers, model_timeout=model_timeout, target_score=target_score,
+        fast_selection=fast_selection, on_setup=lambda setup_df, seconds: progress("train"),
+        on_result=model_finished, on_round=round_finished,
+        cache=training_cache if use_cache else None, preprocessing=preprocessing_config(pipeline),
+    )
+    if best_model is None:
+        raise RuntimeError("No candidate model finished training successfully within its time budget")
+    progress("package")
+    return {
+        "summary": {"model": str(best_model), "compare_df": compare_df},
+        "report": report,
+        "package": build_package(model_inputs, pipeline, best_model, package_format),
+    }
@@ -1,85 +1,66 @@
 import streamlit as st
-import json
-import pickle
-import zipfile
-import os
-import time
-from pycaret.regression import setup as regression_setup, compare_models as regression_compare, pull as regression_pull
-from pycaret.classification import setup as classification_setup, compare_models as classification_compare, pull as classification_pull
-from sklearn.preprocessing import LabelEncoder
-from col_datatype import detect_variable_type
-from preprocessingdata import preprocessingdata
-
-def trainmodels(df, target_type, target):
-    if target_type == "Numeric":
-        with st.spinner("Initializing regression setup..."):
-            start_time = time.time()
-            regression_setup(df, target=target, session_id=1, fold=2, fold_shuffle=True, html=False,
-                            ignore_features=[col for col in df.columns if col != target and df[col].isnull().all()],)
-            st.write("✅ Setup completed in", round(time.time() - start_time, 2), "seconds")
-            
-        with st.spinner("Initializing regression setup pull..."):
-            start_time = time.time()
-            setup_df = regression_pull()
-            st.write("✅ Regression setup is ready")
-            st.dataframe(setup_df)
-            st.write("✅ Model completed in", round(time.time() - start_time, 2), "seconds")
-
-        with st.spinner("Training regression models..."):
-            best_model = regression_compare()
-            compare_df = regression_pull()
-            st.write("✅ Best Regression Model")
-    else:
-        with st.spinner("Initializing classification setup..."):
-            classification_setup(df, target=target, session_id=1, fold_shuffle=True)
-            setup_df = classification_pull()
-            st.write("✅ Classification setup is ready")
-            st.dataframe(setup_df)
-
-        with st.spinner("Training classification models..."):
-            best_model = classification_compare()
-            compare_df = classification_pull()
-            st.write("✅ Best Classification Model")
-
-    best_model.target_name = target
-    st.dataframe(compare_df)
+from col_datatype import variable_types
+from jobs import job_queue, train_job
+from modelscheduler import default_workers
+from modeltraining import (
+    build_package, create_model_inputs, package_formats, prepare_training_data, preprocessing_config,
+    train_model, training_task,
+)
+from traincache import training_cache
+
+def trainmodels(df, target_type, target, workers=None, model_timeout=None, target_score=None, fast_selection=False,
+                cache=None, preprocessing=None):
+    workers = workers or default_workers()
+    task = training_task(target_type)
+    results_table = st.empty()
+
+    def show_setup(setup_df, seconds):
+        st.write(f"✅ {task.capitalize()} setup is ready")
+        st.dataframe(setup_df)
+        st.write("✅ Setup completed in", round(seconds, 2), "seconds")
+
+    def show_result(model_id, row, compare_df):
+        results_table.dataframe(compare_df)
+
+    def show_round(round_info):
+        st.write(f"✅ {round_info['candidates']} candidates on {round_info['rows']:,} rows "
+                 f"in {round_info['seconds']} seconds")
+
+    spinner = "Running successive-halving model selection..." if fast_selection else f"Training {task} models..."
+    with st.spinner(spinner):
+        best_model, compare_df, report = train_model(
+            df, target_type, target, workers=workers, model_timeout=model_timeout, target_score=target_score,
+            fast_selection=fast_selection, on_setup=show_setup, on_result=show_result, on_round=show_round,
+            cache=cache, preprocessing=preprocessing,
+        )
+
+    if report is not None:
+        estimate = " (estimated)" if report["estimated"] else ""
+        st.write(f"✅ Selection finished in {report['seconds']} seconds, "
+                 f"{report['time_saved']} seconds saved versus a full comparison{estimate}")
+        if "score_gap" in report:
+            st.write(f"Score gap in {report['metric']} versus a full comparison{estimate}: {report['score_gap']:.4f}")
+
+    if best_model is None:
+        st.error("❌ No candidate model finished training successfully within its time budget.")
+        results_table.dataframe(compare_df)
+        return None
+
+    if "Cached" in compare_df.columns and compare_df["Cached"].any():
+        st.write(f"✅ Reused {int(compare_df['Cached'].sum())} cached model fits")
+    st.write(f"✅ Best {task.capitalize()} Model")
+    results_table.dataframe(compare_df)
     st.write(best_model)
     return best_model
 
 
-def create_model_inputs(df, target, column_types):
-    model_inputs = {
-        "target": {},
-        "input_columns": {}
-    }
-
-    def build_meta(col, col_type):
-        meta = {
-            "variable_name": col,
-            "variable_type": col_type,
-            "unique_percentage": round(df[col].nunique() / df.shape[0] * 100, 2)
-        }
-        if col_type in ["Binary", "Categorical"]:
-            unique_vals = df[col].dropna().unique()
-            meta["inputs"] = {i + 1: str(val) for i, val in enumerate(unique_vals)}
-        return meta
-
-    model_inputs["target"] = build_meta(target, column_types[target])
-
-    input_cols = [col for col in df.columns if col != target]
-    for idx, col in enumerate(input_cols, start=1):
-        model_inputs["input_columns"][str(idx)] = build_meta(col, column_types[col])
-
-    return model_inputs
-
-
 def mlmodels(df):
     st.subheader('ML Models')
 
     if "df" in st.session_state and st.session_state.df is not None:
         df = st.session_state.df
 
-    column_types = {col: detect_variable_type(df, col) for col in df.columns}
+    column_types = variable_types(df)
     filtered_columns = {col: col_type for col, col_type in column_types.items() if col_type != "Text"}
     columns_with_types = [f"{col} ({col_type})" for col, col_type in filtered_columns.items()]
 
@@ -89,61 +70,74 @@ def mlmodels(df):
 
     model_inputs = create_model_inputs(df, target, column_types)
 
-    encoder = LabelEncoder()
-    if target_type in ["Binary", "Categorical"]:
-        df[target] = encoder.fit_transform(df[target])
+    with st.expander("Training options"):
+        workers = st.number_input("Parallel workers", min_value=1, max_value=default_workers(), value=default_workers())
+        model_timeout = st.number_input("Time budget per model (seconds, 0 for no limit)", min_value=0, value=0)
+        use_target_score = st.checkbox("Stop early once a model reaches a target score",
+                                       help="With fast selection the target only applies to the final "
+                                            "full-data round")
+        metric_name = "R2" if target_type == "Numeric" else "Accuracy"
+        target_score = st.number_input(f"Target {metric_name}", value=0.95) if use_target_score else None
+        fast_selection = st.checkbox("Fast selection on large data (sampled successive halving)",
+                                     value=len(df) > 100_000)
+        package_format = st.selectbox("Model package format", package_formats(),
+                                      help="pickle packages work with the online prediction app; joblib packages "
+                                           "can be compressed or memory-mapped by the batch scorer and server")
+        lean = st.checkbox("Lean memory mode (compact category codes and float32 features)",
+                           value=len(df) > 100_000)
+        approximate = st.checkbox("Approximate outlier bounds (quantile sketches)",
+                                  value=st.session_state.get("profile_sketch", False),
+                                  help="Estimates the quartiles for outlier removal in one pass instead of "
+                                       "sorting every numeric column")
+        use_cache = st.checkbox("Reuse cached model fits for unchanged data and settings", value=True)
+        background = st.checkbox("Train in the background",
+                                 help="Keep using the app while models train; the package appears under "
+                                      "Background jobs in the sidebar")
+        if st.button(f"Clear training cache ({training_cache.size() / 1024**2:,.0f} MB)"):
+            training_cache.clear()
 
     if st.button("Train Model"):
-        df, label_encoders = preprocessingdata(df)
-        df = df.loc[:, df.nunique() > 1]
+        if background:
+            job_queue.submit(
+                "train", train_job, df, target, target_type, workers=workers, model_timeout=model_timeout or None,
+                target_score=target_score, fast_selection=fast_selection, lean=lean, approximate=approximate,
+                package_format=package_format,
+                use_cache=use_cache, name=f"Train {target}", owner=st.session_state.get("session_id"),
+            )
+            st.info("Training started in the background.")
+            return
+
+        df, pipeline = prepare_training_data(df, target, target_type, lean=lean, approximate=approximate)
         st.session_state.df = df
         
         st.write("Dataframe after preprocessing and encoding:")
         st.dataframe(df)
         st.write("Shape after preprocessing:", df.shape)
+        st.write(f"Memory after preprocessing: {df.memory_usage(index=False).sum() / 1024**2:,.1f} MB")
         try:
-            best_model = trainmodels(df, target_type, target)
+            best_model = trainmodels(df, target_type, target, workers=workers,
+                                     model_timeout=model_timeout or None, target_score=target_score,
+                                     fast_selection=fast_selection,
+                                     cache=training_cache if use_cache else None,
+                                     preprocessing=preprocessing_config(pipeline))
             if best_model is None:
                 return
         except Exception as e:
             st.error(f"❌ An unexpected error occurred during model training: {e}")
             return
 
-        os.makedirs("artifacts", exist_ok=True)
-        with open("artifacts/model_inputs.json", "w") as f:
-            json.dump(model_inputs, f, indent=4)
-        with open("artifacts/label_encoders.pkl", "wb") as f:
-            pickle.dump(label_encoders, f)
-        with open("artifacts/best_model.pkl", "wb") as f:
-            pickle.dump(best_model, f)
-
-        zip_filename = "model_package.zip"
-        with zipfile.ZipFile(zip_filename, 'w') as zipf:
-            zipf.write("artifacts/model_inputs.json")
-            zipf.write("artifacts/label_encoders.pkl")
-            zipf.write("artifacts/best_model.pkl")
-
+        package = build_package(model_inputs, pipeline, best_model, package_format)
         
         st.write("To demostrate the model:")
         st.write("1. Open this link [OptiML Suite - Prediction App](https://optimlsuite-app.streamlit.app/)")
         st.write("2. Download the model package you just created.")
         st.write("3. Upload the model package you just created.")
         st.write("4. Enter the inputs for prediction.")
-        with open(zip_filename, "rb") as f:
-            st.download_button(
-                label="Download Trained Model Package",
-                data=f,
-                file_name="model_package.zip",
-                mime="application/zip"
-            )
-
-        try:
-            os.remove(zip_filename)
-            os.remove("artifacts/model_inputs.json")
-            os.remove("artifacts/label_encoders.pkl")
-            os.remove("artifacts/best_model.pkl")
-            os.rmdir("artifacts")
-        except Exception as e:
-            st.warning(f"⚠️ Cleanup failed: {e}")
+        st.download_button(
+            label="Download Trained Model Package",
+            data=package,
+            file_name="model_package.zip",
+            mime="application/zip"
+        )
             
         return best_model
\ No newline at end of file
@@ -0,0 +1,172 @@
+import multiprocessing as mp
+import os
+import pickle
+import time
+from multiprocessing.connection import wait
+import pandas as pd
+
+SORT_METRICS = {"regression": "R2", "classification": "Accuracy"}
+
+def pycaret_module(task):
+    if task == "regression":
+        import pycaret.regression as module
+    else:
+        import pycaret.classification as module
+    return module
+
+def candidate_models(task, include=None, turbo=True):
+    available = pycaret_module(task).models()
+    if include is not None:
+        return [model_id for model_id in include if model_id in available.index]
+    if turbo and "Turbo" in available.columns:
+        available = available[available["Turbo"]]
+    return list(available.index)
+
+def default_workers():
+    return os.cpu_count() or 1
+
+def jobs_per_worker(workers):
+    return max(1, default_workers() // max(1, workers))
+
+def fit_candidate(task, model_id, conn):
+    module = pycaret_module(task)
+    start = time.time()
+    try:
+        model = module.create_model(model_id, verbose=False)
+        table = module.pull()
+        scores = table.loc["Mean"].to_dict()
+        fold_scores = table.drop(index=["Mean", "Std"], errors="ignore").to_dict(orient="index")
+        conn.send((scores, fold_scores, pickle.dumps(model), time.time() - start, None))
+    except Exception as e:
+        conn.send((None, None, None, time.time() - start, repr(e)))
+    finally:
+        conn.close()
+
+def stop_candidate(process, conn):
+    process.terminate()
+    process.join()
+    conn.close()
+
+def build_compare_table(rows, task):
+    compare_df = pd.DataFrame.from_dict(rows, orient="index")
+    sort_metric = SORT_METRICS[task]
+    if sort_metric in compare_df.columns:
+        compare_df = compare_df.sort_values(sort_metric, ascending=False)
+    return compare_df
+
+def cached_row(entry):
+    return {"Model": entry["name"], **entry["scores"], "Status": entry.get("status", "Done"), "Cached": True,
+            "TT (Sec)": entry["elapsed"]}
+
+def cached_comparison(task, entries):
+    if not entries:
+        return None, pd.DataFrame()
+    compare_df = build_compare_table({model_id: cached_row(entry) for model_id, entry in entries.items()}, task)
+    best_id = next((model_id for model_id in compare_df.index if entries[model_id]["model"] is not None), None)
+    return (None if best_id is None else pickle.loads(entries[best_id]["model"])), compare_df
+
+def compare_models_sequential(task, candidates, model_timeout=None):
+    module = pycaret_module(task)
+    budget_time = model_timeout * len(candidates) / 60 if model_timeout else None
+    best_model = module.compare_models(include=candidates, budget_time=budget_time)
+    return best_model, module.pull()
+
+def compare_models_parallel(task, workers=None, model_timeout=None, target_score=None, include=None, on_result=None,
+                            cache=None, cache_key=None):
+    candidates = candidate_models(task, include)
+    if "fork" not in mp.get_all_start_methods():
+        return compare_models_sequential(task, candidates, model_timeout)
+
+    names = pycaret_module(task).models()["Name"].to_dict()
+    sort_metric = SORT_METRICS[task]
+    if cache is not None:
+        default = candidates if include is None else candidate_models(task)
+        cache.save_candidates(cache_key, {"names": names, "default": default})
+    workers = workers or default_workers()
+    context = mp.get_context("fork")
+    pending = list(candidates)
+    running = {}
+    rows, models = {}, {}
+    reached_target = False
+
+    def record(model_id, row):
+        rows[model_id] = row
+        if on_result is not None:
+            on_result(model_id, row, build_compare_table(rows, task))
+
+    def record_failure(model_id, status, elapsed):
+        row = {"Model": names.get(model_id, model_id), "Status": status}
+        if cache is not None:
+            cache.put_failure(cache_key, model_id, row["Model"], status, round(elapsed, 2), model_timeout)
+            row["Cached"] = False
+        row["TT (Sec)"] = round(elapsed, 2)
+        record(model_id, row)
+
+    if cache is not None:
+        for model_id in list(pending):
+            entry = cache.get(cache_key, model_id, model_timeout)
+            if entry is None:
+                continue
+            pending.remove(model_id)
+            if entry["model"] is not None:
+                models[model_id] = pickle.loads(entry["model"])
+            record(model_id, cached_row(entry))
+            if target_score is not None and entry["scores"].get(sort_metric, float("-inf")) >= target_score:
+                reached_target = True
+
+    # Each candidate reports over its own pipe, so terminating one mid-send cannot corrupt the others. Workers
+    # are not daemonic so the estimators inside them can still use n_jobs; the finally block reaps them.
+    try:
+        while running or (pending and not reached_target):
+            while pending and not reached_target and len(running) < workers:
+                model_id = pending.pop(0)
+                reader, writer = context.Pipe(duplex=False)
+                process = context.Process(target=fit_candidate, args=(task, model_id, writer))
+                process.start()
+                writer.close()
+                running[reader] = (model_id, process, time.time())
+
+            for reader in wait(list(running), timeout=0.1):
+                model_id, process, started = running.pop(reader)
+                try:
+                    scores, fold_scores, payload, elapsed, error = reader.recv()
+                except EOFError:
+                    stop_candidate(process, reader)
+                    record_failure(model_id, "Crashed", time.time() - started)
+                    continue
+                reader.close()
+                process.join()
+                if error is not None:
+                    record_failure(model_id, f"Failed: {error}", elapsed)
+                    continue
+                row = {"Model": names.get(model_id, model_id), **scores, "Status": "Done"}
+                models[model_id] = pickle.loads(payload)
+                if cache is not None:
+                    cache.put(cache_key, model_id, row["Model"], scores, fold_scores, payload, round(elapsed, 2))
+                    row["Cached"] = False
+                row["TT (Sec)"] = round(elapsed, 2)
+                record(model_id, row)
+                if target_score is not None and scores.get(sort_metric, float("-inf")) >= target_score:
+                    reached_target = True
+
+            if reached_target:
+                for reader, (model_id, process, started) in list(running.items()):
+                    stop_candidate(process, reader)
+                running.clear()
+                continue
+
+            now = time.time()
+            for reader, (model_id, process, started) in list(running.items()):
+                if model_timeout and now - started > model_timeout:
+                    del running[reader]
+                    stop_candidate(process, reader)
+                    record_failure(model_id, "Timed out", now - started)
+    finally:
+        for reader, (model_id, process, started) in running.items():
+            stop_candidate(process, reader)
+
+    if not models:
+        return None, build_compare_table(rows, task) if rows else pd.DataFrame()
+    compare_df = build_compare_table(rows, task)
+    best_id = next(model_id for model_id in compare_df.index if model_id in models)
+    return models[best_id], compare_df
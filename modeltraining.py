@@ -0,0 +1,194 @@
+import io
+import json
+import os
+import pickle
+import zipfile
+import joblib
+from sklearn.preprocessing import LabelEncoder
+from autocleandata import varying_columns
+from preprocessingdata import code_dtype, keep_columns, preprocessingdata, replace_columns
+from modelscheduler import (
+    cached_comparison, compare_models_parallel, default_workers, jobs_per_worker, pycaret_module,
+)
+from fastselection import successive_halving
+from perftrace import stage
+from traincache import training_cache, training_key
+
+PACKAGE_VERSION = 2
+PACKAGE_FORMATS = {
+    "pickle": None,
+    "joblib": 0,
+    "joblib-zlib": ("zlib", 3),
+    "joblib-lz4": ("lz4", 3),
+}
+
+def training_task(target_type):
+    return "regression" if target_type == "Numeric" else "classification"
+
+def setup_options(df, target_type, target, n_jobs):
+    if target_type == "Numeric":
+        return dict(session_id=1, fold=2, fold_shuffle=True, html=False, n_jobs=n_jobs,
+                    ignore_features=[col for col in df.columns if col != target and df[col].isnull().all()],)
+    return dict(session_id=1, fold_shuffle=True, n_jobs=n_jobs)
+
+def create_model_inputs(df, target, column_types):
+    model_inputs = {
+        "target": {},
+        "input_columns": {}
+    }
+
+    def build_meta(col, col_type):
+        meta = {
+            "variable_name": col,
+            "variable_type": col_type,
+            "unique_percentage": round(df[col].nunique() / df.shape[0] * 100, 2)
+        }
+        if col_type in ["Binary", "Categorical"]:
+            unique_vals = df[col].dropna().unique()
+            meta["inputs"] = {i + 1: str(val) for i, val in enumerate(unique_vals)}
+        return meta
+
+    model_inputs["target"] = build_meta(target, column_types[target])
+
+    input_cols = [col for col in df.columns if col != target]
+    for idx, col in enumerate(input_cols, start=1):
+        model_inputs["input_columns"][str(idx)] = build_meta(col, column_types[col])
+
+    return model_inputs
+
+def prepare_training_data(df, target, target_type, lean=False, approximate=False):
+    encoder = None
+    if target_type in ["Binary", "Categorical"]:
+        encoder = LabelEncoder()
+        codes = encoder.fit_transform(df[target])
+        if lean:
+            codes = codes.astype(code_dtype(encoder.classes_))
+        df = replace_columns(df, {target: codes}, copy=not lean)
+
+    with stage("train.preprocess", df) as record:
+        df, pipeline = preprocessingdata(df, lean=lean, approximate=approximate)
+        df = keep_columns(df, varying_columns(df), copy=not lean)
+        record.output(df)
+    pipeline.target = target
+    pipeline.target_encoder = encoder
+    return df, pipeline
+
+def preprocessing_config(pipeline):
+    return {
+        "outlier_method": pipeline.outlier_method,
+        "factor": pipeline.factor,
+        "threshold": pipeline.threshold,
+        "approximate": pipeline.approximate,
+        "lean": pipeline.lean,
+    }
+
+def train_model(df, target_type, target, workers=None, model_timeout=None, target_score=None,
+                fast_selection=False, on_setup=None, on_result=None, on_round=None,
+                cache=training_cache, preprocessing=None):
+    workers = workers or default_workers()
+    task = training_task(target_type)
+    options = setup_options(df, target_type, target, jobs_per_worker(workers))
+    report = None
+
+    if fast_selection:
+        with stage("train.fast_selection", df):
+            best_model, compare_df, report = successive_halving(
+                df, target, task, options, workers=workers, model_timeout=model_timeout, on_round=on_round,
+                cache=cache, preprocessing=preprocessing, target_score=target_score,
+            )
+    else:
+        key = training_key(df, target, task, options, preprocessing) if cache is not None else None
+        entries = cache.cached_comparison(key, budget=model_timeout) if cache is not None else None
+        if entries:
+            with stage("train.cached_models", df) as record:
+                best_model, compare_df = cached_comparison(task, entries)
+                record.output(compare_df)
+        else:
+            # setup only runs when at least one candidate still has to be fitted
+            module = pycaret_module(task)
+            with stage("train.setup", df) as record:
+                module.setup(df, target=target, **options)
+                setup_df = module.pull()
+            if on_setup is not None:
+                on_setup(setup_df, record.wall)
+
+            with stage("train.compare_models", df) as record:
+                best_model, compare_df = compare_models_parallel(
+                    task, workers=workers, model_timeout=model_timeout,
+                    target_score=target_score, on_result=on_result, cache=cache, cache_key=key,
+                )
+                record.output(compare_df)
+
+    if best_model is not None:
+        best_model.target_name = target
+    return best_model, compare_df, report
+
+def package_formats():
+    formats = list(PACKAGE_FORMATS)
+    try:
+        import lz4  # noqa: F401
+    except ImportError:
+        formats.remove("joblib-lz4")
+    return formats
+
+# Zip entry handles cannot tell(), which joblib needs to pad arrays to an aligned offset for
+# memory mapping, so the entry's own position is tracked here.
+class EntryWriter:
+    def __init__(self, handle):
+        self.handle = handle
+        self.position = 0
+
+    def write(self, data):
+        self.handle.write(data)
+        self.position += memoryview(data).nbytes
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+def write_artifact(zipf, name, value, package_format):
+    compress = PACKAGE_FORMATS[package_format]
+    with zipf.open(name, "w", force_zip64=True) as handle:
+        if compress is None:
+            pickle.dump(value, handle, protocol=pickle.HIGHEST_PROTOCOL)
+        else:
+            joblib.dump(value, EntryWriter(handle), compress=compress)
+
+# Pickled artifacts keep the original artifacts/*.pkl names so packages stay readable by older
+# prediction apps; joblib artifacts are stored uncompressed in the zip, so a "joblib" package
+# can be extracted once and memory-mapped by the loader.
+def write_package(destination, model_inputs, pipeline, best_model, package_format="pickle"):
+    compress = PACKAGE_FORMATS[package_format]
+    extension = "pkl" if compress is None else "joblib"
+    artifacts = {
+        "model_inputs": "artifacts/model_inputs.json",
+        "label_encoders": f"artifacts/label_encoders.{extension}",
+        "pipeline": f"artifacts/preprocessing_pipeline.{extension}",
+        "model": f"artifacts/best_model.{extension}",
+    }
+    manifest = {
+        "version": PACKAGE_VERSION,
+        "serializer": "pickle" if compress is None else "joblib",
+        "compression": compress[0] if isinstance(compress, tuple) else None,
+        "artifacts": artifacts,
+    }
+
+    with stage("train.package"):
+        with zipfile.ZipFile(destination, "w", compression=zipfile.ZIP_STORED) as zipf:
+            zipf.writestr("manifest.json", json.dumps(manifest, indent=4), compress_type=zipfile.ZIP_DEFLATED)
+            zipf.writestr(artifacts["model_inputs"], json.dumps(model_inputs, indent=4), compress_type=zipfile.ZIP_DEFLATED)
+            write_artifact(zipf, artifacts["label_encoders"], pipeline.label_encoders, package_format)
+            write_artifact(zipf, artifacts["pipeline"], pipeline, package_format)
+            write_artifact(zipf, artifacts["model"], best_model, package_format)
+
+def build_package(model_inputs, pipeline, best_model, package_format="pickle"):
+    buffer = io.BytesIO()
+    write_package(buffer, model_inputs, pipeline, best_model, package_format)
+    return buffer.getvalue()
+
+def package_model(path, model_inputs, pipeline, best_model, package_format="pickle"):
+    write_package(f"{path}.tmp", model_inputs, pipeline, best_model, package_format)
+    os.replace(f"{path}.tmp", path)
+    return path
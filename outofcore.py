@@ -0,0 +1,272 @@
+import os
+import warnings
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from pandas.api.types import is_numeric_dtype
+from autocleandata import (
+    RowHashes, classify_columns, clean_columns, most_frequent, row_fingerprints,
+)
+from col_datatype import classify_variable
+from col_stats import NUMERIC_STATS, overview_stats
+from sketches import TopValues, HyperLogLog, chunk_sketches, empty_sketches, merge_sketches
+from perftrace import traced
+
+OUT_OF_CORE_BYTES = int(os.environ.get("OPTIML_OUT_OF_CORE_BYTES", 2 * 1024**3))
+CHUNK_ROWS = 250_000
+SAMPLE_ROWS = 100_000
+# exact dedup keeps an 8-byte hash per distinct row in memory; past this many rows it needs dedup=True
+DEDUP_ROWS = int(os.environ.get("OPTIML_DEDUP_ROWS", 20_000_000))
+
+def parquet_memory_size(path):
+    metadata = pq.ParquetFile(path).metadata
+    encoded = sum(metadata.row_group(i).total_byte_size for i in range(metadata.num_row_groups))
+    return max(encoded, metadata.num_rows * metadata.num_columns * 8)
+
+def source_size(source):
+    if isinstance(source, (str, os.PathLike)):
+        return parquet_memory_size(source) if str(source).endswith(".parquet") else os.path.getsize(source)
+    position = source.tell()
+    source.seek(0, os.SEEK_END)
+    size = source.tell()
+    source.seek(position)
+    return size
+
+def needs_out_of_core(source, threshold=OUT_OF_CORE_BYTES):
+    return source_size(source) > threshold
+
+class MixedTypesError(ValueError):
+    def __init__(self, column):
+        super().__init__(f"Column '{column}' has non-numeric values after its first rows")
+        self.column = column
+
+class DedupLimitError(Exception):
+    pass
+
+def csv_chunks(source, chunksize=CHUNK_ROWS, text_columns=()):
+    source.seek(0)
+    head = pd.read_csv(source, nrows=chunksize)
+    source.seek(0)
+    numeric_cols = [col for col in head.columns if is_numeric_dtype(head[col].dtype) and col not in text_columns]
+    text_dtypes = {col: str for col in head.columns if col not in numeric_cols}
+    with pd.read_csv(source, chunksize=chunksize, dtype=text_dtypes) as reader:
+        for chunk in reader:
+            for col in numeric_cols:
+                values = pd.to_numeric(chunk[col], errors='coerce')
+                if values.isna().sum() > chunk[col].isna().sum():
+                    raise MixedTypesError(col)
+                chunk[col] = values.astype(np.float64)
+            yield chunk
+
+def parquet_chunks(path, chunksize=CHUNK_ROWS):
+    for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize):
+        yield batch.to_pandas()
+
+class ChunkWriter:
+    def __init__(self, path):
+        self.path = path
+        self.writer = None
+        self.schema = None
+        self.rows = 0
+        self.columns = 0
+
+    def write(self, chunk):
+        if self.writer is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self.schema = pa.Schema.from_pandas(chunk, preserve_index=False)
+            self.schema = pa.schema([
+                field.with_type(pa.string()) if pa.types.is_null(field.type) else field for field in self.schema
+            ])
+            self.writer = pq.ParquetWriter(f"{self.path}.tmp", self.schema)
+            self.columns = chunk.shape[1]
+        self.writer.write_table(pa.Table.from_pandas(chunk, schema=self.schema, preserve_index=False))
+        self.rows += len(chunk)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+            os.replace(f"{self.path}.tmp", self.path)
+
+class DistinctTracker:
+    def __init__(self, cap=2):
+        self.cap = cap
+        self.values = {}
+
+    def update(self, df):
+        for col in df.columns:
+            seen = self.values.setdefault(col, set())
+            if len(seen) < self.cap:
+                seen.update(pd.unique(df[col].dropna())[:self.cap])
+
+    def count(self, col):
+        return min(len(self.values.get(col, ())), self.cap)
+
+def derived_columns(col, kind):
+    suffixes = ["_dd", "_mm", "_yyyy"] if kind == "date" else ["_hh", "_mm", "_ss"]
+    return [f"{col}{suffix}" for suffix in suffixes]
+
+def drop_empty_rows(chunk, row_hashes=None):
+    chunk = chunk.dropna(how='all')
+    if row_hashes is not None:
+        chunk = chunk[row_hashes.add_new(row_fingerprints(chunk))]
+    return chunk.copy()
+
+@traced("outofcore.clean")
+def clean_file(source, original_path, cleaned_path, chunksize=CHUNK_ROWS, dedup=None, workers=None, progress_callback=None,
+               text_columns=()):
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as handle:
+            return clean_file(handle, original_path, cleaned_path, chunksize, dedup, workers, progress_callback,
+                              text_columns)
+
+    total_size = source_size(source)
+    original = ChunkWriter(original_path)
+    raw_counts, raw_distinct = None, DistinctTracker()
+    counts, distinct = None, DistinctTracker()
+    sums = pd.Series(dtype=float)
+    frequencies = {}
+    cleaned_rows = 0
+    column_kinds = None
+    row_hashes = None if dedup is False else RowHashes()
+
+    try:
+        for chunk in csv_chunks(source, chunksize, text_columns):
+            original.write(chunk)
+            chunk = drop_empty_rows(chunk, row_hashes)
+            if dedup is None and len(row_hashes) > DEDUP_ROWS:
+                raise DedupLimitError()
+            raw_counts = chunk.count() if raw_counts is None else raw_counts.add(chunk.count(), fill_value=0)
+            raw_distinct.update(chunk)
+            if column_kinds is None:
+                column_kinds = classify_columns(chunk)
+
+            chunk = clean_columns(chunk, column_kinds, workers)
+            counts = chunk.count() if counts is None else counts.add(chunk.count(), fill_value=0)
+            cleaned_rows += len(chunk)
+            distinct.update(chunk)
+            numeric_cols = chunk.select_dtypes(include=[np.number]).columns
+            sums = sums.add(chunk[numeric_cols].sum(), fill_value=0)
+            for col in chunk.select_dtypes(include=[object]).columns:
+                frequencies.setdefault(col, TopValues()).update(chunk[col])
+            if progress_callback is not None and total_size:
+                progress_callback(min(source.tell() / total_size, 1.0) / 2)
+    except MixedTypesError as e:
+        # the Parquet schema is fixed by the first chunk, so the file is read again with the
+        # column kept as text rather than coercing its later values to NaN
+        original.close()
+        return clean_file(source, original_path, cleaned_path, chunksize, dedup, workers, progress_callback,
+                          (*text_columns, e.column))
+    except DedupLimitError:
+        original.close()
+        return clean_file(source, original_path, cleaned_path, chunksize, False, workers, progress_callback,
+                          text_columns)
+    finally:
+        original.close()
+    if raw_counts is None:
+        raise ValueError("The file has no rows to clean")
+
+    raw_columns = [col for col in raw_counts.index if raw_distinct.count(col) > 1]
+    kept_origins = set(raw_columns)
+    origins = {col: col for col in counts.index}
+    for col, (kind, _) in column_kinds.items():
+        origins.update({derived: col for derived in derived_columns(col, kind)})
+    columns = [
+        col for col in counts.index
+        if origins.get(col) in kept_origins and counts[col] > 0 and distinct.count(col) > 1
+    ]
+    means = (sums / counts.reindex(sums.index)).reindex(columns).dropna()
+    # text columns only keep bounded top-value counts, and only columns with gaps need a mode
+    modes = {
+        col: most_frequent(frequencies[col].counts) for col in columns
+        if col in frequencies and counts[col] < cleaned_rows and len(frequencies[col].counts)
+    }
+    column_kinds = {col: kind for col, kind in column_kinds.items() if col in kept_origins}
+
+    cleaned = ChunkWriter(cleaned_path)
+    row_hashes = None if dedup is False else RowHashes()
+    try:
+        for chunk in parquet_chunks(original_path, chunksize):
+            chunk = drop_empty_rows(chunk, row_hashes)
+            chunk = clean_columns(chunk[raw_columns], column_kinds, workers)
+            chunk = chunk.reindex(columns=columns).dropna(how='all')
+            chunk = chunk.fillna({**means.to_dict(), **modes})
+            for col in means.index:
+                chunk[col] = chunk[col].astype(np.float64)
+            cleaned.write(chunk)
+            if progress_callback is not None:
+                progress_callback(0.5 + min(cleaned.rows / max(original.rows, 1), 1.0) / 2)
+    finally:
+        cleaned.close()
+
+    return {
+        "rows_before": original.rows,
+        "rows_after": cleaned.rows,
+        "columns_before": original.columns,
+        "columns_after": cleaned.columns,
+        "deduplicated": dedup is not False,
+    }
+
+@traced("outofcore.stats")
+def file_stats(path, chunksize=CHUNK_ROWS):
+    dtypes = pq.read_schema(path).empty_table().to_pandas().dtypes
+    totals = pd.DataFrame(0.0, index=dtypes.index, columns=["missing", "memory", "sum", "count", "zeros", "negatives", "infinite"])
+    minimum = pd.Series(np.inf, index=dtypes.index)
+    maximum = pd.Series(-np.inf, index=dtypes.index)
+    sketches = empty_sketches()
+    rows = 0
+
+    for chunk in parquet_chunks(path, chunksize):
+        rows += len(chunk)
+        merge_sketches(sketches, chunk_sketches(chunk))
+        totals["missing"] += chunk.isna().sum()
+        totals["memory"] += chunk.memory_usage(deep=True, index=False)
+
+        numeric_cols = chunk.select_dtypes(include="number").columns
+        values = chunk[numeric_cols].to_numpy(dtype=np.float64, na_value=np.nan)
+        finite = np.where(np.isinf(values), np.nan, values)
+        totals.loc[numeric_cols, "sum"] += np.nansum(finite, axis=0)
+        totals.loc[numeric_cols, "count"] += (~np.isnan(finite)).sum(axis=0)
+        totals.loc[numeric_cols, "zeros"] += (values == 0).sum(axis=0)
+        totals.loc[numeric_cols, "negatives"] += (values < 0).sum(axis=0)
+        totals.loc[numeric_cols, "infinite"] += np.isinf(values).sum(axis=0)
+        if len(values):
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore", category=RuntimeWarning)
+                minimum[numeric_cols] = np.fmin(minimum[numeric_cols], np.nanmin(values, axis=0))
+                maximum[numeric_cols] = np.fmax(maximum[numeric_cols], np.nanmax(values, axis=0))
+
+    distinct = sketches["distinct"]
+    numeric = [col for col in dtypes.index if is_numeric_dtype(dtypes[col])]
+    stats = pd.DataFrame(index=dtypes.index)
+    stats["dtype"] = dtypes
+    stats["missing"] = totals["missing"].astype(np.int64)
+    stats["distinct"] = [distinct[col].estimate() if col in distinct else 0 for col in dtypes.index]
+    stats["distinct_error"] = HyperLogLog().relative_error
+    stats["memory"] = totals["memory"].astype(np.int64)
+    stats["mean"] = (totals["sum"] / totals["count"].replace(0, np.nan))[numeric]
+    stats["min"] = minimum[numeric].replace([np.inf, -np.inf], np.nan)
+    stats["max"] = maximum[numeric].replace([np.inf, -np.inf], np.nan)
+    for col in ["zeros", "negatives", "infinite"]:
+        stats[col] = totals[col][numeric].astype("Int64")
+    stats = stats[["dtype", "missing", "distinct", "distinct_error", "memory"] + NUMERIC_STATS]
+    stats["type"] = [classify_variable(dtype, distinct) for dtype, distinct in zip(stats["dtype"], stats["distinct"])]
+
+    duplicates = sketches["duplicates"]
+    overview = overview_stats(
+        rows, len(dtypes), int(stats["missing"].sum()), duplicates.estimate(), stats["memory"].sum(), duplicates.rate_error()
+    )
+    return stats, overview
+
+def sample_rows(path, sample_size=SAMPLE_ROWS, chunksize=CHUNK_ROWS, random_state=0):
+    rng = np.random.default_rng(random_state)
+    sample, keys = None, np.empty(0)
+    for chunk in parquet_chunks(path, chunksize):
+        chunk_keys = rng.random(len(chunk))
+        sample = chunk if sample is None else pd.concat([sample, chunk], ignore_index=True)
+        keys = np.concatenate([keys, chunk_keys])
+        if len(sample) > sample_size:
+            keep = np.sort(np.argpartition(keys, sample_size)[:sample_size])
+            sample, keys = sample.iloc[keep].reset_index(drop=True), keys[keep]
+    return sample
@@ -0,0 +1,55 @@
+import multiprocessing
+import os
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+CLEAN_WORKERS = int(os.environ.get("OPTIML_CLEAN_WORKERS", os.cpu_count() or 1))
+MIN_PARALLEL_CELLS = 200_000
+
+_frame = None
+_func = None
+
+def to_arrow(result):
+    try:
+        table = pa.Table.from_pandas(result, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+        return result
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue()
+
+def from_arrow(result, index):
+    if isinstance(result, pd.DataFrame):
+        result.index = index
+        return result
+    result = pa.ipc.open_stream(result).read_all().to_pandas()
+    result.index = index
+    for col in result.select_dtypes(include=[object]).columns:
+        result[col] = result[col].where(result[col].notna(), np.nan)
+    return result
+
+# Workers are forked after the frame is published, so they read columns straight from the
+# parent's memory; only the results travel back, as Arrow IPC buffers rather than pickled objects.
+def run_column_task(task):
+    col, args = task
+    return to_arrow(_func(_frame[col], *args))
+
+def fork_available():
+    return "fork" in multiprocessing.get_all_start_methods()
+
+def map_columns(df, func, tasks, workers=None):
+    workers = CLEAN_WORKERS if workers is None else workers
+    workers = min(workers, len(tasks))
+    if workers <= 1 or len(df) * len(tasks) < MIN_PARALLEL_CELLS or not fork_available():
+        return [func(df[col], *args) for col, args in tasks]
+
+    global _frame, _func
+    _frame, _func = df, func
+    try:
+        with multiprocessing.get_context("fork").Pool(workers) as pool:
+            results = pool.map(run_column_task, tasks, chunksize=1)
+    finally:
+        _frame, _func = None, None
+    return [from_arrow(result, df.index) for result in results]
@@ -0,0 +1,206 @@
+import contextvars
+import json
+import os
+import resource
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from functools import wraps
+import pandas as pd
+
+_current_trace = contextvars.ContextVar("optiml_trace", default=None)
+RSS_SAMPLE_SECONDS = 0.01
+TRACE_RECORDS = int(os.environ.get("OPTIML_TRACE_RECORDS", 5000))
+
+def peak_rss():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+def current_rss():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return peak_rss()
+
+# ru_maxrss only ever grows, so it cannot say how much memory a later, smaller stage needed;
+# one background thread samples the current RSS into every open stage instead.
+class RssSampler:
+    def __init__(self, interval=RSS_SAMPLE_SECONDS):
+        self.interval = interval
+        self.records = set()
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def run(self):
+        while True:
+            with self.lock:
+                if not self.records:
+                    self.thread = None
+                    return
+                records = list(self.records)
+            rss = current_rss()
+            for record in records:
+                record.rss_high = max(record.rss_high, rss)
+            time.sleep(self.interval)
+
+    def add(self, record):
+        with self.lock:
+            self.records.add(record)
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, daemon=True)
+                self.thread.start()
+
+    def remove(self, record):
+        with self.lock:
+            self.records.discard(record)
+        record.rss_high = max(record.rss_high, current_rss())
+
+_sampler = RssSampler()
+
+def children_cpu():
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+def data_shape(value):
+    if isinstance(value, tuple) and value:
+        value = value[0]
+    if isinstance(value, pd.DataFrame):
+        return value.shape
+    if isinstance(value, pd.Series):
+        return len(value), 1
+    return None, None
+
+def data_memory(value):
+    if isinstance(value, tuple) and value:
+        value = value[0]
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=False, deep=False).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(index=False, deep=False))
+    return None
+
+def megabytes(value):
+    return None if value is None else round(value / 1024**2, 2)
+
+class StageRecord:
+    def __init__(self, name, depth=0, data=None):
+        self.name = name
+        self.depth = depth
+        self.rows_in, self.cols_in = data_shape(data)
+        self.rows_out, self.cols_out = None, None
+        self.frame_in = data_memory(data)
+        self.frame_out = None
+        self.rss_start = current_rss()
+        self.rss_high = self.rss_start
+        self.started = time.time()
+        self.wall = None
+        self.cpu = None
+        self.cpu_children = None
+        self.peak_rss = None
+        self.peak_rss_delta = None
+
+    def output(self, data):
+        self.rows_out, self.cols_out = data_shape(data)
+        self.frame_out = data_memory(data)
+
+    def to_dict(self):
+        return {
+            "stage": self.name,
+            "depth": self.depth,
+            "started": round(self.started, 3),
+            "wall_seconds": None if self.wall is None else round(self.wall, 4),
+            "cpu_seconds": None if self.cpu is None else round(self.cpu, 4),
+            "child_cpu_seconds": None if self.cpu_children is None else round(self.cpu_children, 4),
+            "peak_rss_mb": megabytes(self.peak_rss),
+            "peak_rss_delta_mb": megabytes(self.peak_rss_delta),
+            "stage_peak_mb": megabytes(self.rss_high),
+            "stage_growth_mb": megabytes(self.rss_high - self.rss_start),
+            "frame_in_mb": megabytes(self.frame_in),
+            "frame_out_mb": megabytes(self.frame_out),
+            "rows_in": self.rows_in,
+            "cols_in": self.cols_in,
+            "rows_out": self.rows_out,
+            "cols_out": self.cols_out,
+        }
+
+# A session trace lives as long as the app session and every rerun adds stages, so only the
+# most recent records are kept.
+class Trace:
+    def __init__(self, name="run", max_records=TRACE_RECORDS):
+        self.name = name
+        self.started = time.time()
+        self.records = deque(maxlen=max_records)
+        self.open_stages = []
+
+    def frame(self):
+        stages = pd.DataFrame([record.to_dict() for record in self.records])
+        if len(stages):
+            shape_cols = ["rows_in", "cols_in", "rows_out", "cols_out"]
+            stages[shape_cols] = stages[shape_cols].astype("Int64")
+        return stages
+
+    def to_json(self):
+        return json.dumps({"name": self.name, "started": self.started, "stages": [
+            record.to_dict() for record in self.records
+        ]}, indent=4)
+
+    def save(self, path):
+        with open(path, "w") as f:
+            f.write(self.to_json())
+
+    def clear(self):
+        self.records.clear()
+        self.open_stages = []
+        self.started = time.time()
+
+def current_trace():
+    return _current_trace.get()
+
+def use_trace(trace):
+    _current_trace.set(trace)
+    return trace
+
+@contextmanager
+def stage(name, data=None):
+    trace = _current_trace.get()
+    record = StageRecord(name, len(trace.open_stages) if trace is not None else 0, data)
+    if trace is not None:
+        trace.records.append(record)
+        trace.open_stages.append(record)
+    rss_before = peak_rss()
+    # thread_time keeps stages running concurrently in other threads (other Streamlit sessions) out of
+    # this stage's CPU; work a stage hands to its own thread pools is not counted either
+    cpu_before, children_before = time.thread_time(), children_cpu()
+    _sampler.add(record)
+    start = time.perf_counter()
+    try:
+        yield record
+    finally:
+        _sampler.remove(record)
+        record.wall = time.perf_counter() - start
+        record.cpu = time.thread_time() - cpu_before
+        record.cpu_children = children_cpu() - children_before
+        record.peak_rss = peak_rss()
+        record.peak_rss_delta = record.peak_rss - rss_before
+        if trace is not None:
+            trace.open_stages.remove(record)
+
+def traced(name=None):
+    def decorate(func):
+        label = name or func.__qualname__
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            trace = _current_trace.get()
+            if trace is None or (trace.open_stages and trace.open_stages[-1].name == label):
+                return func(*args, **kwargs)
+            data = next((arg for arg in args if isinstance(arg, (pd.DataFrame, pd.Series))), None)
+            with stage(label, data) as record:
+                result = func(*args, **kwargs)
+                record.output(result)
+            return result
+        return wrapper
+    return decorate
@@ -0,0 +1,183 @@
+import argparse
+import io
+import json
+import os
+import pickle
+import tempfile
+import time
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+from perftrace import traced
+
+_worker_package = None
+PACKAGE_CACHE = os.path.join(tempfile.gettempdir(), "optiml_packages")
+
+def extracted_member(zipf, name):
+    info = zipf.getinfo(name)
+    path = os.path.join(PACKAGE_CACHE, f"{info.CRC:08x}_{info.file_size}_{os.path.basename(name)}")
+    if not os.path.exists(path):
+        os.makedirs(PACKAGE_CACHE, exist_ok=True)
+        with zipf.open(info) as source, open(f"{path}.{os.getpid()}.tmp", "wb") as target:
+            while chunk := source.read(16 * 1024**2):
+                target.write(chunk)
+        os.replace(f"{path}.{os.getpid()}.tmp", path)
+    return path
+
+def read_artifact(zipf, manifest, name, mmap=False):
+    member = manifest["artifacts"][name]
+    if manifest["serializer"] == "pickle":
+        with zipf.open(member) as f:
+            return pickle.load(f)
+    import joblib
+    if mmap and manifest["compression"] is None:
+        return joblib.load(extracted_member(zipf, member), mmap_mode="r")
+    with zipf.open(member) as f:
+        return joblib.load(io.BytesIO(f.read()))
+
+def load_package(path, mmap=False):
+    with zipfile.ZipFile(path) as zipf:
+        if "manifest.json" in zipf.namelist():
+            manifest = json.loads(zipf.read("manifest.json"))
+            return {
+                "model": read_artifact(zipf, manifest, "model", mmap),
+                "label_encoders": read_artifact(zipf, manifest, "label_encoders") or {},
+                "pipeline": read_artifact(zipf, manifest, "pipeline"),
+                "model_inputs": json.loads(zipf.read(manifest["artifacts"]["model_inputs"])),
+            }
+
+        members = {os.path.basename(name): name for name in zipf.namelist()}
+
+        def read_pickle(name):
+            return pickle.loads(zipf.read(members[name])) if name in members else None
+
+        package = {
+            "model": read_pickle("best_model.pkl"),
+            "label_encoders": read_pickle("label_encoders.pkl") or {},
+            "pipeline": read_pickle("preprocessing_pipeline.pkl"),
+            "model_inputs": json.loads(zipf.read(members["model_inputs.json"])) if "model_inputs.json" in members else {},
+        }
+    return package
+
+def feature_columns(package):
+    features = getattr(package["model"], "feature_names_in_", None)
+    if features is not None:
+        return list(features)
+    inputs = package["model_inputs"].get("input_columns", {})
+    return [inputs[key]["variable_name"] for key in sorted(inputs, key=int)]
+
+def prepare_features(package, chunk):
+    pipeline = package["pipeline"]
+    if pipeline is not None:
+        features = pipeline.transform(chunk, fill_missing=True)
+    else:
+        features = chunk.copy()
+        for col, encoder in package["label_encoders"].items():
+            if col in features.columns:
+                features[col] = pd.Categorical(features[col], categories=encoder.classes_).codes
+    return features.reindex(columns=feature_columns(package))
+
+def predict_values(package, chunk):
+    predictions = package["model"].predict(prepare_features(package, chunk))
+    pipeline = package["pipeline"]
+    if pipeline is not None:
+        predictions = pipeline.decode_target(predictions)
+    return predictions
+
+def prediction_column(package):
+    target = package["model_inputs"].get("target", {}).get("variable_name", "prediction")
+    return f"{target}_prediction"
+
+def predict_chunk(package, chunk):
+    return chunk.assign(**{prediction_column(package): predict_values(package, chunk)})
+
+def read_chunks(path, batch_size):
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=batch_size):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=batch_size)
+
+class PredictionWriter:
+    def __init__(self, path):
+        self.path = path
+        self.parquet_writer = None
+        self.header = True
+
+    def write(self, chunk):
+        if self.path.endswith(".parquet"):
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if self.parquet_writer is None:
+                self.parquet_writer = pq.ParquetWriter(self.path, table.schema)
+            self.parquet_writer.write_table(table)
+        else:
+            chunk.to_csv(self.path, mode="w" if self.header else "a", header=self.header, index=False)
+            self.header = False
+
+    def close(self):
+        if self.parquet_writer is not None:
+            self.parquet_writer.close()
+
+def init_worker(package_path, mmap=False):
+    global _worker_package
+    _worker_package = load_package(package_path, mmap)
+
+def predict_in_worker(chunk):
+    return predict_chunk(_worker_package, chunk)
+
+@traced("predict.score_file")
+def score_file(package_path, input_path, output_path, batch_size=100_000, workers=1, progress_callback=None,
+               mmap=False):
+    start = time.time()
+    rows = 0
+    writer = PredictionWriter(output_path)
+
+    def written(chunk):
+        nonlocal rows
+        writer.write(chunk)
+        rows += len(chunk)
+        if progress_callback is not None:
+            progress_callback(rows, rows / max(time.time() - start, 1e-9))
+
+    try:
+        if workers <= 1:
+            package = load_package(package_path, mmap)
+            for chunk in read_chunks(input_path, batch_size):
+                written(predict_chunk(package, chunk))
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(package_path, mmap)) as pool:
+                in_flight = deque()
+                for chunk in read_chunks(input_path, batch_size):
+                    in_flight.append(pool.submit(predict_in_worker, chunk))
+                    if len(in_flight) >= workers * 2:
+                        written(in_flight.popleft().result())
+                while in_flight:
+                    written(in_flight.popleft().result())
+    finally:
+        writer.close()
+
+    seconds = time.time() - start
+    return {"rows": rows, "seconds": round(seconds, 2), "rows_per_second": round(rows / max(seconds, 1e-9), 1)}
+
+def main():
+    parser = argparse.ArgumentParser(description="Score a CSV or Parquet file with an OptiML model package.")
+    parser.add_argument("package", help="Path to model_package.zip")
+    parser.add_argument("input", help="CSV or Parquet file to score")
+    parser.add_argument("output", help="CSV or Parquet file to write predictions to")
+    parser.add_argument("--batch-size", type=int, default=100_000)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--mmap", action="store_true", help="Memory-map model arrays from joblib packages")
+    args = parser.parse_args()
+
+    def report(rows, rate):
+        print(f"{rows:,} rows scored ({rate:,.0f} rows/sec)", flush=True)
+
+    stats = score_file(args.package, args.input, args.output, args.batch_size, args.workers, report, args.mmap)
+    print(f"Done: {stats['rows']:,} rows in {stats['seconds']} seconds ({stats['rows_per_second']:,} rows/sec)")
+
+if __name__ == "__main__":
+    main()
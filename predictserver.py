@@ -0,0 +1,182 @@
+import argparse
+import json
+import queue
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+import pandas as pd
+from predictdata import load_package, predict_values
+
+INPUT_ERRORS = (ValueError, TypeError, KeyError)
+
+class MicroBatcher:
+    def __init__(self, package, max_batch=256, max_wait_ms=5, latency_window=10_000):
+        self.package = package
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.requests = queue.Queue()
+        self.latencies = deque(maxlen=latency_window)
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.rows = 0
+        self.batches = 0
+        self.running = True
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def predict(self, rows, timeout=30):
+        if not rows:
+            return []
+        request = {"rows": rows, "done": threading.Event(), "result": None, "error": None, "start": time.perf_counter()}
+        self.requests.put(request)
+        if not request["done"].wait(timeout):
+            raise TimeoutError("Prediction timed out")
+        if request["error"] is not None:
+            raise request["error"]
+        return request["result"]
+
+    def collect(self):
+        batch = [self.requests.get()]
+        size = len(batch[0]["rows"])
+        deadline = time.perf_counter() + self.max_wait
+        while size < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                request = self.requests.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(request)
+            size += len(request["rows"])
+        return batch
+
+    def score(self, batch):
+        frame = pd.DataFrame([row for request in batch for row in request["rows"]])
+        predictions = np.asarray(predict_values(self.package, frame)).tolist()
+        offset = 0
+        for request in batch:
+            count = len(request["rows"])
+            request["result"] = predictions[offset:offset + count]
+            offset += count
+
+    def run(self):
+        while self.running:
+            batch = self.collect()
+            if not self.running:
+                break
+            try:
+                self.score(batch)
+            except Exception as e:
+                if len(batch) == 1:
+                    batch[0]["error"] = e
+                else:
+                    # requests merged into a failed batch are scored on their own, so one bad
+                    # request does not fail the others
+                    for request in batch:
+                        try:
+                            self.score([request])
+                        except Exception as request_error:
+                            request["error"] = request_error
+
+            finished = time.perf_counter()
+            with self.lock:
+                for request in batch:
+                    self.latencies.append((finished - request["start"]) * 1000)
+                    request["done"].set()
+                self.rows += sum(len(request["rows"]) for request in batch)
+                self.batches += 1
+
+    def metrics(self):
+        with self.lock:
+            latencies = np.array(self.latencies)
+            rows, batches = self.rows, self.batches
+        elapsed = time.time() - self.started
+        return {
+            "requests": len(latencies),
+            "rows": rows,
+            "batches": batches,
+            "mean_batch_rows": round(rows / batches, 2) if batches else 0.0,
+            "p50_ms": round(float(np.percentile(latencies, 50)), 3) if len(latencies) else None,
+            "p99_ms": round(float(np.percentile(latencies, 99)), 3) if len(latencies) else None,
+            "rows_per_second": round(rows / elapsed, 1) if elapsed else 0.0,
+        }
+
+    def close(self):
+        self.running = False
+        self.requests.put({"rows": [], "done": threading.Event(), "result": None, "error": None, "start": 0})
+        self.thread.join()
+
+class PredictionHandler(BaseHTTPRequestHandler):
+    batcher = None
+
+    def send_json(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/health":
+            self.send_json(200, {"status": "ok"})
+        elif self.path == "/metrics":
+            self.send_json(200, self.batcher.metrics())
+        else:
+            self.send_json(404, {"error": "Not found"})
+
+    def do_POST(self):
+        if self.path != "/predict":
+            self.send_json(404, {"error": "Not found"})
+            return
+        try:
+            payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            rows = payload["rows"] if isinstance(payload, dict) and "rows" in payload else payload
+            rows = rows if isinstance(rows, list) else [rows]
+            if not all(isinstance(row, dict) for row in rows):
+                raise ValueError("Each row must be a JSON object of column values")
+            self.send_json(200, {"predictions": self.batcher.predict(rows)})
+        except INPUT_ERRORS as e:
+            self.send_json(400, {"error": str(e)})
+        except Exception as e:
+            self.send_json(500, {"error": str(e)})
+
+    def log_message(self, format, *args):
+        pass
+
+class PredictionServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+def make_server(package_path, host="127.0.0.1", port=8000, max_batch=256, max_wait_ms=5, mmap=False):
+    batcher = MicroBatcher(load_package(package_path, mmap), max_batch=max_batch, max_wait_ms=max_wait_ms)
+    handler = type("BoundPredictionHandler", (PredictionHandler,), {"batcher": batcher})
+    server = PredictionServer((host, port), handler)
+    server.batcher = batcher
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve predictions from an OptiML model package over HTTP.")
+    parser.add_argument("package", help="Path to model_package.zip")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--max-batch", type=int, default=256)
+    parser.add_argument("--max-wait-ms", type=float, default=5)
+    parser.add_argument("--mmap", action="store_true", help="Memory-map model arrays from joblib packages")
+    args = parser.parse_args()
+
+    server = make_server(args.package, args.host, args.port, args.max_batch, args.max_wait_ms, args.mmap)
+    print(f"Serving predictions on http://{args.host}:{server.server_port}/predict", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.batcher.close()
+
+if __name__ == "__main__":
+    main()
@@ -1,53 +1,155 @@
 import numpy as np
-from sklearn.preprocessing import LabelEncoder, StandardScaler
-from col_datatype import detect_variable_type
-
-def remove_outliers_zscore(df, threshold=3):
-    numeric_cols = [col for col in df.columns if detect_variable_type(df, col) == "Numeric"]
-    z_scores = (df[numeric_cols] - df[numeric_cols].mean()) / df[numeric_cols].std()
-    filtered_df = df[(z_scores < threshold).all(axis=1)]
-    return filtered_df
-
-def remove_outliers_iqr(df, factor=1.5):
-    numeric_cols = [col for col in df.columns if detect_variable_type(df, col) == "Numeric"]
-    Q1 = df[numeric_cols].quantile(0.25)
-    Q3 = df[numeric_cols].quantile(0.75)
+import pandas as pd
+from sklearn.preprocessing import LabelEncoder
+from col_datatype import variable_types
+from sketches import frame_sketches
+from perftrace import traced
+
+def sketch_quantiles(df, numeric_cols, qs):
+    sketches = frame_sketches(df[numeric_cols])["quantiles"]
+    return pd.DataFrame({col: sketches[col].quantile(qs) for col in numeric_cols}, index=qs, dtype=float)
+
+@traced("preprocess.outlier_bounds")
+def outlier_bounds(df, method="iqr", factor=1.5, threshold=3, approximate=False):
+    numeric_cols = [col for col, col_type in variable_types(df).items() if col_type == "Numeric"]
+    if method == "zscore":
+        mean = df[numeric_cols].mean()
+        std = df[numeric_cols].std()
+        return numeric_cols, None, mean + threshold * std
+    if approximate:
+        quantiles = sketch_quantiles(df, numeric_cols, [0.25, 0.75])
+    else:
+        quantiles = df[numeric_cols].quantile([0.25, 0.75])
+    Q1, Q3 = quantiles.loc[0.25], quantiles.loc[0.75]
     IQR = Q3 - Q1
-    lower_bound = Q1 - (factor * IQR)
-    upper_bound = Q3 + (factor * IQR)
-    filtered_df = df[~((df[numeric_cols] < lower_bound) | (df[numeric_cols] > upper_bound)).any(axis=1)]
-    return filtered_df
-
-def encode_categorical_columns(df):
-    label_encoders = {}
-    categorical_cols = df.select_dtypes(include=[object]).columns
-
-    for col in categorical_cols:
-        le = LabelEncoder()
-        df[col] = le.fit_transform(df[col])
-        label_encoders[col] = le
-    return df, label_encoders
-
-def scale_numeric_columns(df):
-    numeric_cols = df.select_dtypes(include=[np.number]).columns
-    scaler = StandardScaler()
-    
-    for col in numeric_cols:
-        variable_type = detect_variable_type(df, col)
-        if variable_type not in ["Category", "Binary"]:
-            df[col] = scaler.fit_transform(df[[col]])
+    return numeric_cols, Q1 - (factor * IQR), Q3 + (factor * IQR)
+
+def outlier_mask(df, numeric_cols, lower_bound, upper_bound):
+    values = df[numeric_cols]
+    if lower_bound is None:
+        return (values < upper_bound).all(axis=1)
+    return ~((values < lower_bound) | (values > upper_bound)).any(axis=1)
+
+def replace_columns(df, columns, copy=True):
+    if not copy:
+        data = {col: df[col] for col in df.columns}
+        data.update(columns)
+        return pd.DataFrame(data, index=df.index, copy=False)
+    df = df.copy()
+    for col, values in columns.items():
+        df[col] = values
     return df
 
-def preprocessingdata(df):
+def keep_columns(df, columns, copy=True):
+    if not copy:
+        return pd.DataFrame({col: df[col] for col in columns}, index=df.index, copy=False)
+    return df.loc[:, columns]
+
+def code_dtype(categories):
+    for dtype in (np.int8, np.int16, np.int32):
+        if len(categories) < np.iinfo(dtype).max:
+            return dtype
+    return np.int64
+
+class PreprocessingPipeline:
+    def __init__(self, outlier_method="iqr", factor=1.5, threshold=3, approximate=False, lean=False):
+        self.outlier_method = outlier_method
+        self.factor = factor
+        self.threshold = threshold
+        self.approximate = approximate
+        self.lean = lean
+        self.outlier_cols = []
+        self.lower_bound = None
+        self.upper_bound = None
+        self.categories = {}
+        self.scale_mean = pd.Series(dtype=float)
+        self.scale_std = pd.Series(dtype=float)
+        self.target = None
+        self.target_encoder = None
+
+    def fit(self, df):
+        self.fit_transform(df)
+        return self
+
+    @traced("preprocess.fit")
+    def fit_transform(self, df):
+        if self.outlier_method in ("iqr", "zscore"):
+            self.outlier_cols, self.lower_bound, self.upper_bound = outlier_bounds(
+                df, self.outlier_method, self.factor, self.threshold, self.approximate
+            )
+            df = df[outlier_mask(df, self.outlier_cols, self.lower_bound, self.upper_bound)]
+
+        categorical_cols = df.select_dtypes(include=[object, "category", "string"]).columns
+        self.categories = {col: pd.Categorical(df[col]).categories for col in categorical_cols}
+        df = self.encode(df)
+
+        numeric_cols = df.select_dtypes(include=[np.number]).columns
+        column_types = variable_types(df[numeric_cols])
+        scale_cols = [col for col in numeric_cols if column_types[col] not in ["Category", "Binary"]]
+        self.scale_mean = df[scale_cols].mean()
+        self.scale_std = df[scale_cols].std(ddof=0).replace(0, 1)
+        return self.scale(df)
+
+    def encode(self, df):
+        lean = getattr(self, "lean", False)
+        encoded = {
+            col: pd.Categorical(df[col], categories=categories).codes.astype(code_dtype(categories) if lean else np.int64)
+            for col, categories in self.categories.items() if col in df.columns
+        }
+        return replace_columns(df, encoded, copy=not lean)
+
+    def scale(self, df):
+        lean = getattr(self, "lean", False)
+        scale_cols = [col for col in self.scale_mean.index if col in df.columns]
+        if not scale_cols:
+            return df
+        if lean:
+            scaled = {
+                col: ((df[col] - self.scale_mean[col]) / self.scale_std[col]).astype(np.float32)
+                for col in scale_cols
+            }
+            return replace_columns(df, scaled, copy=False)
+        scaled = (df[scale_cols] - self.scale_mean[scale_cols]) / self.scale_std[scale_cols]
+        return replace_columns(df, {col: scaled[col] for col in scale_cols})
+
+    @traced("preprocess.transform")
+    def transform(self, df, drop_outliers=False, fill_missing=False):
+        if drop_outliers and self.outlier_cols:
+            cols = [col for col in self.outlier_cols if col in df.columns]
+            lower = self.lower_bound[cols] if self.lower_bound is not None else None
+            df = df[outlier_mask(df, cols, lower, self.upper_bound[cols])]
+        df = self.scale(self.encode(df))
+        if fill_missing:
+            df = df.fillna({col: 0.0 for col in self.scale_mean.index if col in df.columns})
+        return df
+
+    def decode_target(self, predictions):
+        predictions = np.asarray(predictions)
+        if self.target in self.scale_mean.index:
+            predictions = predictions * self.scale_std[self.target] + self.scale_mean[self.target]
+        if self.target_encoder is not None:
+            codes = np.clip(np.rint(predictions).astype(np.int64), 0, len(self.target_encoder.classes_) - 1)
+            predictions = self.target_encoder.inverse_transform(codes)
+        return predictions
+
+    @property
+    def label_encoders(self):
+        label_encoders = {}
+        for col, categories in self.categories.items():
+            le = LabelEncoder()
+            le.classes_ = np.asarray(categories, dtype=object)
+            label_encoders[col] = le
+        return label_encoders
+
+def preprocessingdata(df, lean=False, approximate=False):
     method = 1
 
     if method == 0:
-        df = remove_outliers_zscore(df)
+        pipeline = PreprocessingPipeline(outlier_method="zscore", approximate=approximate, lean=lean)
     elif method == 1:
-        df = remove_outliers_iqr(df)
+        pipeline = PreprocessingPipeline(outlier_method="iqr", approximate=approximate, lean=lean)
     else:
-        pass
-    
-    df, label_encoders = encode_categorical_columns(df)
-    df = scale_numeric_columns(df)
-    return df, label_encoders
\ No newline at end of file
+        pipeline = PreprocessingPipeline(outlier_method=None, approximate=approximate, lean=lean)
+
+    df = pipeline.fit_transform(df)
+    return df, pipeline
@@ -1,24 +1,16 @@
-import numpy as np
 import streamlit as st
 import matplotlib.pyplot as plt
 import seaborn as sns
 from streamlit_option_menu import option_menu
-from col_datatype import detect_variable_type
+from col_stats import column_stats, dataset_stats
+from correlations import correlation_matrix, top_pairs
+from sketches import frame_sketches
 
-def overview(df):
+def overview(df, approximate=False):
+    stats = column_stats(df, approximate=approximate)
     c1, c2 = st.columns(2)
     with c1:
-        stats = {
-            "Number of variables": df.shape[1],
-            "Number of observations": df.shape[0],
-            "Missing cells": df.isnull().sum().sum(),
-            "Missing cells (%)": (df.isnull().sum().sum() / (df.shape[0] * df.shape[1])) * 100,
-            "Duplicate rows": df.duplicated().sum(),
-            "Duplicate rows (%)": (df.duplicated().sum() / df.shape[0]) * 100,
-            "Total size in memory": f"{df.memory_usage(deep=True).sum() / 1024**2:.2f} MB",
-            "Average record size in memory": f"{df.memory_usage(deep=True).sum() / df.shape[0]:.2f} bytes",
-        }
-        for key, value in stats.items():
+        for key, value in dataset_stats(df, approximate=approximate).items():
             st.write(f"- {key}: {value}")
 
     with c2:
@@ -29,102 +21,100 @@ def overview(df):
             "Binary": 0,
             "Numeric": 0,
         }
-        for col in df.columns:
-            var_type = detect_variable_type(df, col)
-            variable_types[var_type] += 1
+        for var_type, count in stats["type"].value_counts().items():
+            variable_types[var_type] += count
 
         for var_type, count in variable_types.items():
             st.write(f"- {var_type}: {count}")
 
-def variable_overview(df):
+def variable_overview(df, approximate=False):
     st.write("### Variables Overview")
     columns = sorted(df.columns)
     col = st.selectbox("Search or Select Column", options=columns, index=0, key="variable_select")
     if col:
+        stats = column_stats(df, approximate=approximate).loc[col]
+        rows = len(df)
         st.write(f"### {col}")
-        var_type = detect_variable_type(df, col)
+        var_type = stats["type"]
         st.write(f"**Variable Type:** {var_type}")
         c3, c4 = st.columns(2)
-        if var_type in ["Text", "Categorical"]:
-            with c3:
-                content = {
-                    "Distinct": df[col].nunique(),
-                    "Distinct (%)": (df[col].nunique() / len(df)) * 100,
-                    "Missing": df[col].isnull().sum(),
-                    "Missing (%)": (df[col].isnull().sum() / len(df)) * 100,
-                    "Memory size": f"{df[col].memory_usage(deep=True) / 1024:.2f} KB",
-                }
-                for key, value in content.items():
-                    st.write(f"- {key}: {value}")
+        content = {
+            "Distinct": stats["distinct"],
+            "Distinct (%)": (stats["distinct"] / rows) * 100,
+            "Missing": stats["missing"],
+            "Missing (%)": (stats["missing"] / rows) * 100,
+        }
+        if var_type == "Numeric":
+            content.update({
+                "Infinite": stats["infinite"],
+                "Infinite (%)": (stats["infinite"] / rows) * 100,
+                "Mean": stats["mean"],
+                "Min": stats["min"],
+                "Max": stats["max"],
+                "Zeros": stats["zeros"],
+                "Zeros (%)": (stats["zeros"] / rows) * 100,
+                "Negatives": stats["negatives"],
+                "Negatives (%)": (stats["negatives"] / rows) * 100,
+            })
+            if approximate:
+                sketch = frame_sketches(df)["quantiles"][col]
+                error = f"± {sketch.rank_error * 100:.2f}% rank"
+                for q, value in zip([0.05, 0.25, 0.5, 0.75, 0.95], sketch.quantile([0.05, 0.25, 0.5, 0.75, 0.95])):
+                    content[f"{q:.0%} quantile"] = f"≈ {value:.4g} ({error})"
+        if approximate:
+            content["Distinct"] = f"≈ {stats['distinct']:,} (± {stats['distinct_error'] * 100:.2f}%)"
+            content["Distinct (%)"] = f"≈ {(stats['distinct'] / rows) * 100:.2f}"
+        content["Memory size"] = f"{stats['memory'] / 1024:.2f} KB"
 
-            with c4:
-                if var_type == "Categorical":
-                    fig, ax = plt.subplots()
-                    df[col].value_counts().plot.pie(autopct="%1.1f%%", ax=ax)
-                    ax.set_ylabel("")
-                    st.pyplot(fig)
+        with c3:
+            for key, value in content.items():
+                st.write(f"- {key}: {value}")
 
-        elif var_type == "Binary":
-            with c3:
-                content = {
-                    "Distinct": df[col].nunique(),
-                    "Distinct (%)": (df[col].nunique() / len(df)) * 100,
-                    "Missing": df[col].isnull().sum(),
-                    "Missing (%)": (df[col].isnull().sum() / len(df)) * 100,
-                    "Memory size": f"{df[col].memory_usage(deep=True) / 1024:.2f} KB",
-                }
-                for key, value in content.items():
-                    st.write(f"- {key}: {value}")
-            with c4:
+        with c4:
+            if var_type in ["Categorical", "Binary"]:
                 fig, ax = plt.subplots()
                 df[col].value_counts().plot.pie(autopct="%1.1f%%", ax=ax)
                 ax.set_ylabel("")
                 st.pyplot(fig)
-
-        elif var_type == "Numeric":
-            with c3:
-                content = {
-                    "Distinct": df[col].nunique(),
-                    "Distinct (%)": (df[col].nunique() / len(df)) * 100,
-                    "Missing": df[col].isnull().sum(),
-                    "Missing (%)": (df[col].isnull().sum() / len(df)) * 100,
-                    "Infinite": np.isinf(df[col]).sum(),
-                    "Infinite (%)": (np.isinf(df[col]).sum() / len(df)) * 100,
-                    "Mean": df[col].mean(),
-                    "Min": df[col].min(),
-                    "Max": df[col].max(),
-                    "Zeros": (df[col] == 0).sum(),
-                    "Zeros (%)": ((df[col] == 0).sum() / len(df)) * 100,
-                    "Negatives": (df[col] < 0).sum(),
-                    "Negatives (%)": ((df[col] < 0).sum() / len(df)) * 100,
-                    "Memory size": f"{df[col].memory_usage(deep=True) / 1024:.2f} KB",
-                }
-                for key, value in content.items():
-                    st.write(f"- {key}: {value}")
-            with c4:
+            elif var_type == "Numeric":
                 fig, ax = plt.subplots()
                 df[col].plot.hist(bins=20, ax=ax)
                 ax.set_title(f"Distribution of {col}")
                 st.pyplot(fig)
 
 def correlations_overview(df):
-    encoded_df = df.copy()
-    for col in df.columns:
-        var_type = detect_variable_type(df, col)
-        if var_type == "Categorical" or var_type == "Binary":
-            encoded_df[col] = df[col].astype("category").cat.codes
+    c1, c2, c3 = st.columns(3)
+    with c1:
+        method = st.selectbox("Method", ["Pearson", "Spearman"], key="corr_method").lower()
+    with c2:
+        view = st.selectbox("View", ["Matrix", "Strongest pairs"], key="corr_view")
+    with c3:
+        sample_rows = None
+        if len(df) > 100_000 and st.checkbox("Estimate on a row sample", value=True, key="corr_sample"):
+            sample_rows = st.number_input("Sample rows", min_value=1_000, max_value=len(df), value=100_000, key="corr_rows")
 
-    numeric_cols = encoded_df.select_dtypes(include=["number"])
-    if not numeric_cols.empty:
-        corr = numeric_cols.corr()
-        corr = corr[sorted(corr.columns)].loc[sorted(corr.columns)]
-        fig, ax = plt.subplots(figsize=(10, 8))
-        sns.heatmap(corr, annot=True, fmt=".2f", cmap="coolwarm", ax=ax)
-        st.pyplot(fig)
-    else:
+    corr, counts = correlation_matrix(df, method=method, sample_rows=sample_rows)
+    if corr is None:
         st.write("No numeric, binary, or categorical columns available for correlation analysis.")
+        return
+
+    if view == "Strongest pairs":
+        top_k = st.slider("Number of pairs", min_value=5, max_value=200, value=20, key="corr_top_k")
+        threshold = st.slider("Minimum absolute correlation", min_value=0.0, max_value=1.0, value=0.0, key="corr_threshold")
+        pairs = top_pairs(corr, counts if sample_rows else None, k=top_k, threshold=threshold, method=method)
+        st.dataframe(pairs)
+    else:
+        annotate = len(corr) <= 30
+        size = min(max(10, len(corr) * 0.25), 40)
+        fig, ax = plt.subplots(figsize=(size, size * 0.8))
+        sns.heatmap(corr, annot=annotate, fmt=".2f", cmap="coolwarm", vmin=-1, vmax=1, ax=ax,
+                    xticklabels=len(corr) <= 100, yticklabels=len(corr) <= 100)
+        st.pyplot(fig)
 
 def profiledata(df):
+    approximate = st.checkbox(
+        "Sketch mode (approximate distinct counts, quantiles and duplicates)", value=False, key="profile_sketch",
+    )
     menu_choice = option_menu(
         menu_title=None,
         options=["Dataset Statistics", "Variables", "Correlations"],
@@ -135,10 +125,10 @@ def profiledata(df):
 
     if menu_choice == "Dataset Statistics":
         with st.spinner("Loading overview..."):
-            overview(df)
+            overview(df, approximate)
 
     elif menu_choice == "Variables":
-        variable_overview(df)
+        variable_overview(df, approximate)
 
     elif menu_choice == "Correlations":
         with st.spinner("Loading correlation overview..."):
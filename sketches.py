@@ -0,0 +1,221 @@
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_numeric_dtype
+from autocleandata import row_fingerprints
+from datacache import cached
+from perftrace import traced
+
+HLL_PRECISION = 14
+KLL_K = 200
+DUPLICATE_SAMPLES = 1_000_000
+TOP_VALUES = 1000
+SKETCH_CHUNK_ROWS = 1_000_000
+
+def value_hashes(series):
+    values = series.dropna()
+    if is_numeric_dtype(values.dtype) and values.dtype != bool:
+        values = values.astype(np.float64) + 0.0
+    return pd.util.hash_pandas_object(values, index=False).to_numpy()
+
+def leading_zeros(values):
+    values = values.copy()
+    zeros = np.zeros(len(values), dtype=np.uint8)
+    for shift in (32, 16, 8, 4, 2, 1):
+        empty = (values >> np.uint64(64 - shift)) == 0
+        zeros[empty] += shift
+        values[empty] <<= np.uint64(shift)
+    zeros[values == 0] = 64
+    return zeros
+
+class HyperLogLog:
+    def __init__(self, precision=HLL_PRECISION):
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    @property
+    def relative_error(self):
+        return 1.04 / np.sqrt(len(self.registers))
+
+    def update(self, hashes):
+        if len(hashes) == 0:
+            return self
+        index = (hashes >> np.uint64(64 - self.precision)).astype(np.int64)
+        rank = np.minimum(leading_zeros(hashes << np.uint64(self.precision)), 64 - self.precision) + 1
+        best = pd.Series(rank).groupby(index).max()
+        self.registers[best.index] = np.maximum(self.registers[best.index], best.to_numpy(dtype=np.uint8))
+        return self
+
+    def merge(self, other):
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def estimate(self):
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        empty = int((self.registers == 0).sum())
+        if estimate <= 2.5 * m and empty:
+            estimate = m * np.log(m / empty)
+        return int(round(estimate))
+
+# KLL compactors: level h holds items of weight 2**h, and lower levels get geometrically
+# smaller capacities so the sketch stays O(k) while remaining mergeable.
+class QuantileSketch:
+    def __init__(self, k=KLL_K, random_state=0):
+        self.k = k
+        self.levels = [np.empty(0)]
+        self.count = 0
+        self.rng = np.random.default_rng(random_state)
+
+    @property
+    def rank_error(self):
+        return 2.296 / self.k ** 0.9723
+
+    def capacity(self, level):
+        return max(2, int(np.ceil(self.k * (2 / 3) ** (len(self.levels) - 1 - level))))
+
+    def compress(self):
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self.capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                items = np.sort(items)
+                keep = items[:1] if len(items) % 2 else items[:0]
+                items = items[len(keep):]
+                promoted = items[self.rng.integers(2)::2]
+                self.levels[level] = keep
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+                level = 0
+            else:
+                level += 1
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        self.count += len(values)
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self.compress()
+        return self
+
+    def merge(self, other):
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.count += other.count
+        self.compress()
+        return self
+
+    def quantile(self, q):
+        items = np.concatenate(self.levels)
+        if len(items) == 0:
+            return np.full(np.shape(q), np.nan) if np.ndim(q) else np.nan
+        weights = np.concatenate([np.full(len(level), 2.0 ** h) for h, level in enumerate(self.levels)])
+        order = np.argsort(items)
+        items, cumulative = items[order], np.cumsum(weights[order])
+        positions = np.searchsorted(cumulative, np.asarray(q) * cumulative[-1], side="left")
+        return items[np.minimum(positions, len(items) - 1)]
+
+# Rows are kept when their hash falls in a 1 / 2**bits slice of the hash space, so every copy
+# of a row lands in the same sample; the slice halves whenever the sample outgrows its budget.
+class DuplicateSketch:
+    def __init__(self, max_samples=DUPLICATE_SAMPLES):
+        self.max_samples = max_samples
+        self.bits = 0
+        self.samples = np.empty(0, dtype=np.uint64)
+        self.count = 0
+
+    def sampled(self, hashes, bits):
+        return hashes[(hashes & np.uint64((1 << bits) - 1)) == 0]
+
+    def shrink(self):
+        while len(self.samples) > self.max_samples:
+            self.bits += 1
+            self.samples = self.sampled(self.samples, self.bits)
+
+    def update(self, hashes):
+        self.count += len(hashes)
+        self.samples = np.concatenate([self.samples, self.sampled(hashes, self.bits)])
+        self.shrink()
+        return self
+
+    def merge(self, other):
+        self.bits = max(self.bits, other.bits)
+        self.samples = np.concatenate([self.sampled(self.samples, self.bits), self.sampled(other.samples, self.bits)])
+        self.count += other.count
+        self.shrink()
+        return self
+
+    def duplicate_rate(self):
+        if len(self.samples) == 0:
+            return 0.0
+        return 1 - len(np.unique(self.samples)) / len(self.samples)
+
+    def rate_error(self):
+        if len(self.samples) == 0:
+            return 0.0
+        rate = self.duplicate_rate()
+        return 1.96 * np.sqrt(max(rate * (1 - rate), 1 / len(self.samples)) / len(self.samples))
+
+    def estimate(self):
+        return int(round(self.duplicate_rate() * self.count))
+
+# Only the `capacity` most frequent values are carried from chunk to chunk, so memory stays
+# bounded for ID-like columns while columns with fewer distinct values are counted exactly.
+class TopValues:
+    def __init__(self, capacity=TOP_VALUES):
+        self.capacity = capacity
+        self.counts = pd.Series(dtype=float)
+
+    def update(self, values):
+        counts = values.value_counts()
+        counts = counts.astype(float) if self.counts.empty else self.counts.add(counts, fill_value=0)
+        if len(counts) > self.capacity:
+            counts = counts.sort_values(ascending=False, kind="stable").iloc[:self.capacity]
+        self.counts = counts
+        return self
+
+def frame_chunks(df, chunk_rows=SKETCH_CHUNK_ROWS):
+    for start in range(0, len(df), chunk_rows):
+        yield df.iloc[start:start + chunk_rows]
+
+def chunk_sketches(chunk):
+    numeric_cols = chunk.select_dtypes(include="number").columns
+    return {
+        "distinct": {col: HyperLogLog().update(value_hashes(chunk[col])) for col in chunk.columns},
+        "quantiles": {col: QuantileSketch().update(chunk[col].to_numpy(dtype=np.float64, na_value=np.nan)) for col in numeric_cols},
+        "duplicates": DuplicateSketch().update(row_fingerprints(chunk)),
+    }
+
+def merge_sketches(sketches, other):
+    for kind in ("distinct", "quantiles"):
+        for col, sketch in other[kind].items():
+            if col in sketches[kind]:
+                sketches[kind][col].merge(sketch)
+            else:
+                sketches[kind][col] = sketch
+    sketches["duplicates"].merge(other["duplicates"])
+    return sketches
+
+def empty_sketches():
+    return {"distinct": {}, "quantiles": {}, "duplicates": DuplicateSketch()}
+
+@traced("profile.sketches")
+@cached
+def frame_sketches(df, chunk_rows=SKETCH_CHUNK_ROWS, workers=1):
+    chunks = frame_chunks(df, chunk_rows)
+    if workers > 1:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            parts = list(pool.map(chunk_sketches, chunks))
+    else:
+        parts = map(chunk_sketches, chunks)
+
+    sketches = empty_sketches()
+    for part in parts:
+        merge_sketches(sketches, part)
+    for col in df.columns:
+        sketches["distinct"].setdefault(col, HyperLogLog())
+    return sketches
@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+
+COLUMN_MIX = {
+    "numeric": 0.3,
+    "integer": 0.1,
+    "categorical": 0.2,
+    "text": 0.1,
+    "date": 0.1,
+    "time": 0.1,
+    "money": 0.1,
+}
+DATE_FORMATS = ["%Y-%m-%d", "%d/%m/%Y", "%m-%d-%Y", "%d %b %Y"]
+TIME_FORMATS = ["%H:%M:%S", "%H:%M", "%I:%M %p"]
+CATEGORIES = ["North", "south", "EAST", "west", "Central", "n/a"]
+WORDS = np.array([
+    "Fast", "delivery!", "great", "PRICE", "would", "buy", "again.", "poor", "quality,", "refund", "late",
+    "excellent", "support", "broken", "item", "ok", "thanks", "#1", "recommend", "never", "-", "value",
+])
+
+def column_kinds(columns, mix=None):
+    mix = COLUMN_MIX if mix is None else mix
+    weights = np.array(list(mix.values()), dtype=float)
+    counts = np.floor(weights / weights.sum() * columns).astype(int)
+    counts[np.argsort(-weights)[:columns - counts.sum()]] += 1
+    return [kind for kind, count in zip(mix, counts) for _ in range(count)]
+
+def text_values(rng, rows, words=3):
+    picks = rng.integers(0, len(WORDS), size=(rows, words))
+    text = pd.Series(WORDS[picks[:, 0]])
+    for i in range(1, words):
+        text = text + " " + WORDS[picks[:, i]]
+    return text
+
+def synthetic_column(rng, kind, rows, i):
+    if kind == "numeric":
+        return pd.Series(rng.normal(loc=i, scale=1 + i % 5, size=rows).round(4))
+    if kind == "integer":
+        return pd.Series(rng.integers(0, 10 ** (2 + i % 4), size=rows))
+    if kind == "categorical":
+        return pd.Series(np.array(CATEGORIES)[rng.integers(0, len(CATEGORIES), size=rows)])
+    if kind == "text":
+        return text_values(rng, rows)
+    if kind == "date":
+        days = rng.integers(0, 3650, size=rows)
+        return pd.Series((pd.Timestamp("2015-01-01") + pd.to_timedelta(days, unit="D")).strftime(DATE_FORMATS[i % len(DATE_FORMATS)]))
+    if kind == "time":
+        seconds = rng.integers(0, 86400, size=rows)
+        return pd.Series((pd.Timestamp("2020-01-01") + pd.to_timedelta(seconds, unit="s")).strftime(TIME_FORMATS[i % len(TIME_FORMATS)]))
+    if kind == "money":
+        amounts = rng.gamma(2.0, 50.0, size=rows).round(2)
+        return pd.Series(amounts).map(lambda value: f"${value:.2f}")
+    raise ValueError(f"Unknown column kind: {kind}")
+
+def synthetic_dataset(rows, columns=20, null_rate=0.05, duplicate_rate=0.02, mix=None, seed=0):
+    rng = np.random.default_rng(seed)
+    unique_rows = max(1, int(round(rows * (1 - duplicate_rate))))
+    data = {}
+    for i, kind in enumerate(column_kinds(columns, mix)):
+        values = synthetic_column(rng, kind, unique_rows, i)
+        if null_rate:
+            values = values.where(rng.random(unique_rows) >= null_rate)
+        data[f"{kind}_{i}"] = values
+
+    df = pd.DataFrame(data)
+    numeric = df.select_dtypes(include="number")
+    signal = numeric.fillna(0).sum(axis=1) if numeric.shape[1] else pd.Series(0.0, index=df.index)
+    signal = (signal - signal.mean()) / (signal.std() or 1)
+    df["target"] = np.where(signal + rng.normal(scale=0.5, size=unique_rows) > 0, "yes", "no")
+
+    if rows > unique_rows:
+        duplicates = df.iloc[rng.integers(0, unique_rows, size=rows - unique_rows)]
+        df = pd.concat([df, duplicates], ignore_index=True)
+        df = df.iloc[rng.permutation(len(df))].reset_index(drop=True)
+    return df
@@ -0,0 +1,66 @@
+import pandas as pd
+from autocleandata import IncrementalCleaner
+from datastore import (
+    append_dataset, delete_dataset, has_parts, list_datasets, load_cleaner, load_dataset, save_cleaner, save_dataset,
+)
+from syntheticdata import synthetic_dataset
+
+def frame(start, rows):
+    return pd.DataFrame({"id": range(start, start + rows), "value": [i * 0.5 for i in range(rows)], "label": "a"})
+
+def test_append_round_trip(tmp_path):
+    root = str(tmp_path)
+    batches = [frame(0, 100), frame(100, 20), frame(120, 30)]
+    save_dataset(batches[0], "k", root=root)
+    for batch in batches[1:]:
+        append_dataset(batch, "k", root=root)
+
+    assert has_parts("k", "original", root)
+    pd.testing.assert_frame_equal(load_dataset("k", root=root), pd.concat(batches, ignore_index=True))
+    assert list_datasets(root)["k"]["kinds"]["original"]["rows"] == 150
+
+    delete_dataset("k", root)
+    assert list_datasets(root) == {}
+    assert not (tmp_path / "k").exists()
+
+def test_append_empty_frame_writes_nothing(tmp_path):
+    root = str(tmp_path)
+    save_dataset(frame(0, 10), "k", root=root)
+    assert append_dataset(frame(0, 0), "k", root=root) is None
+    assert not has_parts("k", "original", root)
+
+def test_append_schema_mismatch_rewrites_dataset(tmp_path):
+    root = str(tmp_path)
+    base = frame(0, 10)
+    save_dataset(base, "k", root=root)
+    append_dataset(frame(10, 5), "k", root=root)
+    mismatched = frame(15, 5).assign(id=["x1", "x2", "x3", "x4", "x5"])
+    append_dataset(mismatched, "k", root=root)
+
+    assert not has_parts("k", "original", root)
+    loaded = load_dataset("k", root=root)
+    assert len(loaded) == 20
+    assert loaded["id"].tolist()[-5:] == ["x1", "x2", "x3", "x4", "x5"]
+    assert list_datasets(root)["k"]["kinds"]["original"]["rows"] == 20
+
+def test_cleaner_round_trip_with_appends(tmp_path):
+    root = str(tmp_path)
+    df = synthetic_dataset(3000, 6, seed=1)
+    first, second = df.iloc[:2000], df.iloc[2000:]
+    duplicate = df.iloc[:50]
+
+    reference = IncrementalCleaner()
+    reference.fit_transform(first.copy())
+    expected = [reference.append(second.copy()), reference.append(duplicate.copy())]
+
+    cleaner = IncrementalCleaner()
+    save_dataset(cleaner.fit_transform(first.copy()), "k", "cleaned", root=root)
+    save_cleaner(cleaner, "k", root)
+    cleaner = load_cleaner("k", root)
+    appended = cleaner.append(second.copy())
+    save_cleaner(cleaner, "k", root, append=True)
+    cleaner = load_cleaner("k", root)
+
+    pd.testing.assert_frame_equal(appended, expected[0])
+    pd.testing.assert_frame_equal(cleaner.append(duplicate.copy()), expected[1])
+    assert len(expected[1]) == 0
@@ -0,0 +1,81 @@
+import os
+import time
+from jobs import JobQueue
+
+def finish(progress=None):
+    progress("work", 0.5)
+    return {"summary": {"rows": 3}, "data": list(range(3))}
+
+def fail(progress=None):
+    raise ValueError("bad input")
+
+def crash(progress=None):
+    os._exit(3)
+
+def sleep(progress=None):
+    progress("sleeping")
+    time.sleep(60)
+
+def wait_for(queue, job_id, timeout=30):
+    deadline = time.time() + timeout
+    while queue.get(job_id).active and time.time() < deadline:
+        time.sleep(0.05)
+    return queue.get(job_id)
+
+def wait_for_status(queue, job_id, status, timeout=30):
+    deadline = time.time() + timeout
+    while queue.get(job_id).status != status and time.time() < deadline:
+        time.sleep(0.05)
+    return queue.get(job_id)
+
+def test_done_job_keeps_summary_and_result(tmp_path):
+    queue = JobQueue(root=str(tmp_path))
+    job = wait_for(queue, queue.submit("test", finish))
+    assert job.status == "done"
+    assert job.summary == {"rows": 3}
+    assert queue.result(job.id)["data"] == [0, 1, 2]
+
+def test_failed_job_reports_error(tmp_path):
+    queue = JobQueue(root=str(tmp_path))
+    job = wait_for(queue, queue.submit("test", fail))
+    assert job.status == "failed"
+    assert "bad input" in job.error
+    assert queue.result(job.id) is None
+
+def test_crashed_job_is_marked_failed(tmp_path):
+    queue = JobQueue(root=str(tmp_path))
+    job = wait_for(queue, queue.submit("test", crash))
+    assert job.status == "failed"
+    assert "code 3" in job.error
+
+def test_cancel_running_job(tmp_path):
+    queue = JobQueue(root=str(tmp_path))
+    job_id = queue.submit("test", sleep)
+    job = wait_for_status(queue, job_id, "running")
+    process = job.process
+    open(queue.result_path(job_id), "wb").close()
+    assert queue.cancel(job_id)
+    assert job.status == "cancelled"
+    assert not process.is_alive()
+    assert not os.path.exists(queue.result_path(job_id))
+    assert not queue.cancel(job_id)
+
+def test_cancel_queued_job_never_starts(tmp_path):
+    queue = JobQueue(max_workers=1, root=str(tmp_path))
+    running = queue.submit("test", sleep)
+    queued = queue.submit("test", finish)
+    wait_for_status(queue, running, "running")
+    assert queue.cancel(queued)
+    queue.cancel(running)
+    time.sleep(0.5)
+    assert queue.get(queued).status == "cancelled"
+    assert queue.get(queued).started is None
+
+def test_failed_start_does_not_stop_the_queue(tmp_path):
+    blocker = tmp_path / "file"
+    blocker.write_text("")
+    queue = JobQueue(root=str(blocker))
+    job = wait_for(queue, queue.submit("test", finish))
+    assert job.status == "failed"
+    queue.root = str(tmp_path / "jobs")
+    assert wait_for(queue, queue.submit("test", finish)).status == "done"
@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+from sketches import DuplicateSketch, HyperLogLog, QuantileSketch, TopValues, value_hashes
+
+def hashes(values):
+    return value_hashes(pd.Series(values))
+
+def test_hyperloglog_within_error_bound():
+    sketch = HyperLogLog().update(hashes(np.arange(200_000)))
+    assert abs(sketch.estimate() - 200_000) / 200_000 < 3 * sketch.relative_error
+
+def test_hyperloglog_merge_counts_union():
+    left = HyperLogLog().update(hashes(np.arange(0, 60_000)))
+    right = HyperLogLog().update(hashes(np.arange(40_000, 100_000)))
+    merged = left.merge(right)
+    assert abs(merged.estimate() - 100_000) / 100_000 < 3 * merged.relative_error
+
+def test_hyperloglog_small_counts_are_exact_enough():
+    assert abs(HyperLogLog().update(hashes(np.arange(100))).estimate() - 100) <= 2
+
+def test_quantile_sketch_within_rank_error():
+    values = np.random.default_rng(0).lognormal(size=300_000)
+    sketch = QuantileSketch()
+    for chunk in np.array_split(values, 7):
+        sketch.update(chunk)
+    qs = np.linspace(0.01, 0.99, 25)
+    ranks = np.searchsorted(np.sort(values), sketch.quantile(qs)) / len(values)
+    assert np.max(np.abs(ranks - qs)) <= sketch.rank_error
+
+def test_quantile_sketch_merge_within_rank_error():
+    values = np.random.default_rng(1).normal(size=200_000)
+    merged = QuantileSketch()
+    for chunk in np.array_split(values, 4):
+        merged.merge(QuantileSketch().update(chunk))
+    assert merged.count == len(values)
+    qs = np.array([0.05, 0.25, 0.5, 0.75, 0.95])
+    ranks = np.searchsorted(np.sort(values), merged.quantile(qs)) / len(values)
+    assert np.max(np.abs(ranks - qs)) <= merged.rank_error
+
+def test_duplicate_sketch_within_error_bound():
+    rows = np.random.default_rng(2).integers(0, 150_000, size=200_000)
+    exact = 1 - len(np.unique(rows)) / len(rows)
+    sketch = DuplicateSketch(max_samples=20_000).update(hashes(rows))
+    assert sketch.bits > 0
+    assert abs(sketch.duplicate_rate() - exact) < 3 * sketch.rate_error()
+
+def test_top_values_bounded_and_exact_for_few_values():
+    top = TopValues(capacity=10)
+    for chunk in np.array_split(np.arange(1000), 5):
+        top.update(pd.Series(chunk))
+    assert len(top.counts) == 10
+
+    top = TopValues(capacity=10)
+    values = pd.Series(list("aabbbc") * 100)
+    for start in range(0, len(values), 250):
+        top.update(values.iloc[start:start + 250])
+    assert top.counts.to_dict() == {"a": 200, "b": 300, "c": 100}
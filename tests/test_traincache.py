@@ -0,0 +1,67 @@
+import os
+import pickle
+from traincache import TrainingCache
+
+def put(cache, key, model_id, size=1000):
+    cache.put(key, model_id, model_id.upper(), {"Accuracy": 0.9}, None, b"x" * size, 0.1)
+
+def test_round_trip_and_hit_counts(tmp_path):
+    cache = TrainingCache(str(tmp_path))
+    put(cache, "k", "lr")
+    entry = cache.get("k", "lr")
+    assert entry["name"] == "LR" and entry["model"] == b"x" * 1000
+    assert cache.get("k", "dt") is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+def test_eviction_keeps_size_under_limit(tmp_path):
+    cache = TrainingCache(str(tmp_path), max_bytes=5000)
+    for number in range(10):
+        put(cache, "k", f"m{number}")
+        assert cache.size() <= 5000
+    assert cache.get("k", "m9") is not None
+    assert cache.get("k", "m0") is None
+
+def test_eviction_drops_least_recently_used(tmp_path):
+    cache = TrainingCache(str(tmp_path), max_bytes=3500)
+    for number, model_id in enumerate(["a", "b", "c"]):
+        put(cache, "k", model_id)
+        os.utime(cache.entry_path("k", model_id), (number, number))
+    cache.get("k", "a")
+    put(cache, "k", "d")
+    assert cache.get("k", "b") is None
+    assert cache.get("k", "a") is not None
+
+def test_oversized_entry_is_not_stored(tmp_path):
+    cache = TrainingCache(str(tmp_path), max_bytes=500)
+    put(cache, "k", "lr")
+    assert cache.get("k", "lr") is None
+    assert cache.size() == 0
+
+def test_evicted_key_directory_is_removed(tmp_path):
+    cache = TrainingCache(str(tmp_path), max_bytes=2500)
+    cache.save_candidates("old", {"names": {"lr": "LR"}, "default": ["lr"]})
+    put(cache, "old", "lr")
+    os.utime(cache.entry_path("old", "lr"), (0, 0))
+    cache.save_candidates("new", {"names": {"lr": "LR"}, "default": ["lr"]})
+    put(cache, "new", "lr")
+    put(cache, "new", "dt")
+    assert not os.path.exists(os.path.join(str(tmp_path), "old"))
+    assert cache.candidates("old") is None
+    assert cache.cached_comparison("new", ["lr", "dt"]) is not None
+
+def test_failures_reused_only_under_matching_budget(tmp_path):
+    cache = TrainingCache(str(tmp_path))
+    cache.put_failure("k", "slow", "Slow", "Timed out", 5.0, budget=5)
+    cache.put_failure("k", "boom", "Boom", "Failed: ValueError()", 0.1, budget=5)
+    assert cache.get("k", "slow", budget=3) is not None
+    assert cache.get("k", "slow", budget=10) is None
+    assert cache.get("k", "slow") is None
+    assert cache.get("k", "boom", budget=5) is not None
+    assert cache.get("k", "boom", budget=10) is None
+
+def test_corrupt_entry_is_a_miss(tmp_path):
+    cache = TrainingCache(str(tmp_path))
+    put(cache, "k", "lr")
+    with open(cache.entry_path("k", "lr"), "wb") as f:
+        f.write(pickle.dumps({"name": "LR"})[:5])
+    assert cache.get("k", "lr") is None
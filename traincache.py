@@ -0,0 +1,186 @@
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import tempfile
+import threading
+from datacache import fingerprint
+
+TRAIN_CACHE_DIR = os.environ.get("OPTIML_TRAIN_CACHE", ".optiml_train_cache")
+TRAIN_CACHE_BYTES = int(os.environ.get("OPTIML_TRAIN_CACHE_BYTES", 4 * 1024**3))
+IGNORED_SETUP_OPTIONS = {"n_jobs", "html", "verbose"}
+
+def pycaret_version():
+    try:
+        from importlib.metadata import version
+        return version("pycaret")
+    except Exception:
+        return None
+
+def training_key(df, target, task, setup_kwargs, preprocessing=None):
+    options = {name: value for name, value in setup_kwargs.items() if name not in IGNORED_SETUP_OPTIONS}
+    spec = json.dumps({
+        "data": fingerprint(df),
+        "target": target,
+        "task": task,
+        "setup": options,
+        "preprocessing": preprocessing,
+        "pycaret": pycaret_version(),
+    }, sort_keys=True, default=str)
+    return hashlib.blake2b(spec.encode(), digest_size=16).hexdigest()
+
+# One directory per (data, preprocessing, target, fold spec) key and one file per fitted
+# candidate; files are touched on every hit, so eviction drops the least recently used fits.
+class TrainingCache:
+    def __init__(self, root=TRAIN_CACHE_DIR, max_bytes=TRAIN_CACHE_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def entry_path(self, key, model_id):
+        return os.path.join(self.root, key, f"{model_id}.pkl")
+
+    def candidates_path(self, key):
+        return os.path.join(self.root, key, "candidates.json")
+
+    # Several threads and forked jobs write into the same directories, so every write gets its own
+    # temporary file; the lock keeps evict from removing a directory between makedirs and the write.
+    def write(self, path, data):
+        with self.lock:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            f = tempfile.NamedTemporaryFile(dir=os.path.dirname(path), suffix=".tmp", delete=False)
+        try:
+            with f:
+                f.write(data)
+            os.replace(f.name, path)
+        except BaseException:
+            os.remove(f.name)
+            raise
+
+    # A fitted model is reusable under any time budget; a timeout only under the same or a
+    # smaller budget, and other failures only under the budget they happened with.
+    def usable(self, entry, budget=None):
+        status = entry.get("status", "Done")
+        if status == "Done":
+            return True
+        if status == "Timed out":
+            return budget is not None and entry["budget"] is not None and budget <= entry["budget"]
+        return entry.get("budget") == budget
+
+    def get(self, key, model_id, budget=None):
+        path = self.entry_path(key, model_id)
+        try:
+            with open(path, "rb") as f:
+                entry = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            entry = None
+        if entry is None or not self.usable(entry, budget):
+            with self.lock:
+                self.misses += 1
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        with self.lock:
+            self.hits += 1
+        return entry
+
+    def put(self, key, model_id, name, scores, fold_scores, payload, elapsed):
+        entry = {
+            "name": name,
+            "scores": scores,
+            "fold_scores": fold_scores,
+            "model": payload,
+            "elapsed": elapsed,
+        }
+        data = pickle.dumps(entry, protocol=pickle.HIGHEST_PROTOCOL)
+        if len(data) > self.max_bytes:
+            return
+        self.write(self.entry_path(key, model_id), data)
+        self.evict()
+
+    def put_failure(self, key, model_id, name, status, elapsed, budget=None):
+        entry = {
+            "name": name,
+            "status": status,
+            "scores": {},
+            "fold_scores": None,
+            "model": None,
+            "elapsed": elapsed,
+            "budget": budget,
+        }
+        self.write(self.entry_path(key, model_id), pickle.dumps(entry, protocol=pickle.HIGHEST_PROTOCOL))
+
+    def candidates(self, key):
+        try:
+            with open(self.candidates_path(key)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def save_candidates(self, key, candidates):
+        self.write(self.candidates_path(key), json.dumps(candidates).encode())
+
+    def entries(self):
+        if not os.path.isdir(self.root):
+            return []
+        entries = []
+        for directory in os.scandir(self.root):
+            if not directory.is_dir():
+                continue
+            for entry in os.scandir(directory.path):
+                if entry.name.endswith(".pkl"):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def size(self):
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self):
+        with self.lock:
+            entries = sorted(self.entries())
+            total = sum(size for _, size, _ in entries)
+            emptied = set()
+            for _, size, path in entries:
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+                total -= size
+                emptied.add(os.path.dirname(path))
+            # rmdir leaves a directory alone while another writer still has a temporary file in it
+            for directory in emptied:
+                try:
+                    if not any(name.endswith(".pkl") for name in os.listdir(directory)):
+                        os.remove(os.path.join(directory, "candidates.json"))
+                        os.rmdir(directory)
+                except OSError:
+                    pass
+
+    def cached_comparison(self, key, include=None, budget=None):
+        candidates = self.candidates(key)
+        if candidates is None:
+            return None
+        if include is None:
+            model_ids = candidates["default"]
+        else:
+            model_ids = [model_id for model_id in include if model_id in candidates["names"]]
+        entries = {}
+        for model_id in model_ids:
+            entry = self.get(key, model_id, budget)
+            if entry is None:
+                return None
+            entries[model_id] = entry
+        return entries
+
+    def clear(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+training_cache = TrainingCache()